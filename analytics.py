@@ -0,0 +1,271 @@
+import os
+import threading
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+import numpy as np
+from db import all_shards, data_version, get_conn, shard_for
+from models import parse_updates, try_parse_date
+
+GRANULARITIES = ("day", "week", "month")
+# most periods one series may have, e.g. a year of days or twenty years of weeks
+MAX_PERIODS = 1000
+# rows fetched at a time when scanning a whole shard
+BATCH_SIZE = 2000
+# date.toordinal() of 1970-01-01, numpy's datetime64 epoch
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+LABEL_FORMATS = {"day": "%d/%m", "week": "%d/%m", "month": "%m/%Y"}
+
+# pipeline stages in order; Rejected, No Response (and unknown statuses) end a pipeline
+STAGES = ("Applied", "OA", "Interview", "Offer")
+STAGE_RANK = {stage: rank for rank, stage in enumerate(STAGES)}
+# conversion funnel, OA is optional so it is left out
+FUNNEL = ("Applied", "Interview", "Offer")
+# response time percentiles, overall and per company
+PERCENTILES = (50, 75, 90)
+# companies listed in the response time breakdown, most responses first
+TOP_COMPANIES = 20
+# users whose funnel is kept per process
+FUNNEL_CACHE_SIZE = int(os.getenv("FUNNEL_CACHE_SIZE", 1024))
+
+# ordinal (days since 0001-01-01) of a stored date string, None if it can't be parsed.
+# accounts share a small set of distinct dates, so parsing is cached
+@lru_cache(maxsize=8192)
+def date_ordinal(date_str):
+    # fast path for the stored format, dd/mm/yyyy
+    if isinstance(date_str, str) and len(date_str) == 10 and date_str[2] == date_str[5] == "/":
+        try:
+            return date(int(date_str[6:]), int(date_str[3:5]), int(date_str[:2])).toordinal()
+        except ValueError:
+            pass
+    dt = try_parse_date(date_str)
+    return dt.toordinal() if dt else None
+
+def event_ordinals(updates_lists):
+    """Applied and first response dates of applications, as two arrays of date ordinals.
+
+    Same rules as the dashboard stats: an application counts if its first update is
+    'Applied', and its response is the second update unless that is 'No Response'.
+    Dates that can't be parsed count as today, like parse_date."""
+    today = date.today().toordinal()
+    applied, responses = [], []
+    for updates in updates_lists:
+        if not updates or updates[0].get("status") != "Applied":
+            continue
+        applied.append(date_ordinal(updates[0].get("date")) or today)
+        if len(updates) > 1 and updates[1].get("status") != "No Response":
+            responses.append(date_ordinal(updates[1].get("date")) or today)
+    return np.array(applied, dtype=np.int64), np.array(responses, dtype=np.int64)
+
+# updates of every application on every shard, read in batches (admin-wide views)
+def iter_all_updates():
+    for shard in all_shards():
+        with get_conn(shard=shard, readonly=True) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT updates FROM applications")
+            for (updates,) in iter_rows(cur):
+                yield parse_updates(updates)
+
+# period number of each date ordinal; consecutive periods have consecutive numbers
+def period_index(ordinals, granularity):
+    if granularity == "day":
+        return ordinals
+    if granularity == "week":
+        # weeks start on Sunday, ordinal 7 (0001-01-07) is a Sunday
+        return ordinals // 7
+    # months since 1970-01
+    return (ordinals - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+# first day (as an ordinal) of each period number
+def period_start(indexes, granularity):
+    if granularity == "day":
+        return indexes
+    if granularity == "week":
+        return indexes * 7
+    return indexes.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+def timeseries(applied, responses, granularity="week", start=None, end=None):
+    """Applications and responses per day/week/month between start and end (dates,
+    inclusive), with empty periods filled with zeros.
+
+    Without start/end the series covers the data, up to the latest MAX_PERIODS periods.
+    Raises ValueError for an unknown granularity, a range that is too long, or start after end."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    events = np.concatenate([applied, responses])
+    series = {"granularity": granularity, "labels": [], "ranges": [], "starts": [], "applied": [], "responses": []}
+    if start is None and end is None and not events.size:
+        return series
+
+    # a missing bound follows the data, but never crosses the given one (zero-filled instead)
+    today = date.today().toordinal()
+    start_ord = start.toordinal() if start else int(events.min()) if events.size else today
+    end_ord = end.toordinal() if end else int(events.max()) if events.size else today
+    if start and not end:
+        end_ord = max(end_ord, start_ord)
+    elif end and not start:
+        start_ord = min(start_ord, end_ord)
+    elif start_ord > end_ord:
+        raise ValueError("start must not be after end")
+
+    first, last = (int(i) for i in period_index(np.array([start_ord, end_ord]), granularity))
+    if last - first >= MAX_PERIODS:
+        if start:
+            raise ValueError(f"range is longer than {MAX_PERIODS} {granularity}s")
+        first = last - MAX_PERIODS + 1
+        start_ord = int(period_start(np.array([first]), granularity)[0])
+
+    # count each series in one pass: bucket, then bincount over the period range
+    def count(ordinals):
+        in_range = ordinals[(ordinals >= start_ord) & (ordinals <= end_ord)]
+        return np.bincount(period_index(in_range, granularity) - first, minlength=last - first + 1)
+
+    bounds = period_start(np.arange(first, last + 2), granularity)
+    label_format = LABEL_FORMATS[granularity]
+    for period_first, next_first in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        first_day = date.fromordinal(period_first)
+        last_day = date.fromordinal(next_first - 1)
+        series["labels"].append(first_day.strftime(label_format))
+        series["ranges"].append(f"{first_day.strftime('%d/%m')} → {last_day.strftime('%d/%m')}")
+        series["starts"].append(first_day.isoformat())
+    series["applied"] = count(applied).tolist()
+    series["responses"] = count(responses).tolist()
+    return series
+
+# granularity/start/end query parameters (dates as YYYY-MM-DD), raises ValueError if invalid
+def timeseries_args(args):
+    start, end = args.get("start"), args.get("end")
+    return (
+        args.get("granularity", "week"),
+        date.fromisoformat(start) if start else None,
+        date.fromisoformat(end) if end else None,
+    )
+
+# stage of a status (OA1 -> OA, HR Interview -> Interview, ...), other statuses as they are
+def stage_of(status):
+    if not status or status in STAGE_RANK:
+        return status
+    if status.startswith("OA"):
+        return "OA"
+    if "Interview" in status:
+        return "Interview"
+    return status
+
+def percentiles(values):
+    values = np.percentile(values, PERCENTILES)
+    return {f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, values)}
+
+def funnel_stats(rows):
+    """Stage analytics of (company, updates) rows, computed in one pass over the rows:
+      - funnel: applications reaching Applied/Interview/Offer, with conversion from the
+        previous stage and from Applied
+      - stageDays: median days spent in Applied, OA and Interview before the next stage
+        or an outcome (stays still in progress are left out)
+      - transitions: how often each stage led to each next stage or outcome
+      - responseDays: days from Applied to the first response (as in the dashboard stats),
+        overall and for the companies with the most responses"""
+    today = date.today().toordinal()
+    total = 0
+    furthest = Counter()
+    transitions = Counter()
+    stage_days = {stage: [] for stage in STAGES[:-1]}
+    companies = {}  # company -> index into response_companies
+    response_companies, response_days = [], []
+
+    for company, updates in rows:
+        updates = parse_updates(updates)
+        if not updates:
+            continue
+        total += 1
+        rank = 0    # having an entry at all means they applied
+        stage = entered = None
+        for upd in updates:
+            step = stage_of(upd.get("status"))
+            day = date_ordinal(upd.get("date")) or today
+            rank = max(rank, STAGE_RANK.get(step, 0))
+            if step == stage:
+                continue    # e.g. Interview1 -> Interview2, still interviewing
+            if stage is not None:
+                transitions[stage, step] += 1
+                if stage in stage_days:
+                    stage_days[stage].append(day - entered)
+            stage, entered = step, day
+        furthest[rank] += 1
+
+        if len(updates) > 1 and updates[0].get("status") == "Applied" and updates[1].get("status") != "No Response":
+            applied = date_ordinal(updates[0].get("date")) or today
+            responded = date_ordinal(updates[1].get("date")) or today
+            response_companies.append(companies.setdefault(company, len(companies)))
+            response_days.append(responded - applied)
+
+    # applications that got at least as far as each stage
+    reached = {stage: sum(n for rank, n in furthest.items() if rank >= STAGE_RANK[stage]) for stage in FUNNEL}
+    funnel = []
+    previous = total
+    for stage in FUNNEL:
+        funnel.append({
+            "stage": stage,
+            "count": reached[stage],
+            "rate": round(reached[stage] / previous * 100, 1) if previous else None,
+            "overall": round(reached[stage] / total * 100, 1) if total else None,
+        })
+        previous = reached[stage]
+
+    result = {
+        "applications": total,
+        "funnel": funnel,
+        "stageDays": {
+            stage: {"count": len(days), "median": round(float(np.median(days)), 1) if days else None}
+            for stage, days in stage_days.items()
+        },
+        "transitions": [[src, dst, n] for (src, dst), n in transitions.most_common()],
+        "responseDays": {"count": len(response_days), **(percentiles(response_days) if response_days else {})},
+        "companies": [],
+    }
+
+    if response_days:
+        # group response times by company: sort by company, then split where it changes
+        codes = np.array(response_companies)
+        days = np.array(response_days)
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes)
+        groups = np.split(days[order], np.cumsum(counts)[:-1])
+        names = list(companies)
+        # most responses first, then by name
+        top = sorted(range(len(names)), key=lambda i: (-counts[i], names[i]))[:TOP_COMPANIES]
+        result["companies"] = [{"company": names[i], "count": int(counts[i]), **percentiles(groups[i])} for i in top]
+    return result
+
+_funnel_cache = {}  # user_id -> (data version, funnel_stats result)
+_funnel_cache_lock = threading.Lock()
+
+# funnel_stats of a user's applications, recomputed only when their data version changed.
+# a cache hit costs one primary key lookup instead of reading the whole history
+def user_funnel(user_id):
+    shard = shard_for(user_id)
+    with get_conn(user_id, shard=shard, readonly=True) as conn:
+        cur = conn.cursor()
+        version = data_version(cur, user_id, shard)
+        cached = _funnel_cache.get(user_id)
+        if version is not None and cached and cached[0] == version:
+            return cached[1]
+
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        cur.execute(f"SELECT company, updates FROM applications WHERE user_id = {p} ORDER BY id", (user_id,))
+        result = funnel_stats(iter_rows(cur))
+
+    if version is None:
+        return result   # no data_versions table yet, nothing to tell a stale entry by
+    with _funnel_cache_lock:
+        _funnel_cache.pop(user_id, None)
+        if len(_funnel_cache) >= FUNNEL_CACHE_SIZE:
+            _funnel_cache.pop(next(iter(_funnel_cache)))   # least recently computed
+        _funnel_cache[user_id] = (version, result)
+    return result
+
+# rows of an executed query, fetched in batches
+def iter_rows(cur):
+    while rows := cur.fetchmany(BATCH_SIZE):
+        yield from rows
@@ -1,21 +1,21 @@
 import csv
 from io import StringIO
 import os
-from flask import Flask, Response, flash, json, jsonify, render_template, request, redirect, session, url_for
-from flask_mail import Mail, Message
-import sqlite3
-from datetime import datetime, timedelta
+import click
+from flask import Blueprint, Response, current_app, flash, json, jsonify, render_template, request, redirect, session, url_for
+from datetime import datetime
 from collections import Counter
-from dotenv import load_dotenv
-import psycopg2
 import json
+from compression import PrecompressedFlask, compress_response, compress_static_command, static_url
+from models import DATE_FORMAT, ApplicationRecord, parse_date, parse_updates
+from db import assign_shard, get_conn, init_db, integrity_errors, preload_driver, seen_recently, set_last_seen, sync_sqlite_replicas
+from maintenance import INACTIVE_DAYS, JOB_KINDS, create_job, job_summary, load_rollups, maintenance_cli, pause_job, recent_jobs, run_job
+from shards import shards_cli
+from tasks import run_in_background, run_job_in_background
 
-app = Flask(__name__)
-app.secret_key = "ILoveDucks"
+# all routes live on this blueprint, the app itself is built by create_app()
+bp = Blueprint("main", __name__)
 
-load_dotenv()  # load environment variables
-
-DATE_FORMAT = "%d/%m/%Y"
 # default updates seperator between status and date
 UPDATES_SEPERATOR = " - "
 # number of days passed to consider no response
@@ -23,89 +23,62 @@ NO_RESPONSE_DAYS = 14
 # auto no response status
 AUTO_NO_RESPONSE = True
 
-# configure Flask-Mail
-app.config["MAIL_SERVER"] = "smtp.gmail.com"
-app.config["MAIL_PORT"] = 465
-app.config["MAIL_USE_TLS"] = False
-app.config["MAIL_USE_SSL"] = True
-app.config["MAIL_USERNAME"] = os.getenv('MAIL_USERNAME')
-app.config["MAIL_PASSWORD"] = os.getenv('MAIL_PASSWORD')    # no hacking!
-app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_USERNAME")
-mail = Mail(app)
-
-# connect to databases file
-def get_conn():
-    db_url = os.environ.get("DATABASE_URL")
-    if db_url:
-        # running on Render → use PostgreSQL
-        return psycopg2.connect(db_url)
-    else:
-        # running locally → use SQLite
-        return sqlite3.connect("databases.db")
-
-# initialize database if doesn't exist
-def init_db():
-    db_url = os.environ.get("DATABASE_URL")
-
-    if (not db_url):
-        # SQLite
-        with get_conn() as conn:
-            cur = conn.cursor()
-            # users table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT NOT NULL UNIQUE,
-                    password TEXT NOT NULL
-                )
-            """)
-
-            # applications table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS applications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    updates TEXT,
-                    notes TEXT,
-                    user_id INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-
-            conn.commit()
-    else:
-        # PostgreSQL
-        with get_conn() as conn:
-            cur = conn.cursor()
-            # users table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(20) NOT NULL UNIQUE,
-                    password VARCHAR(20) NOT NULL
-                )
-            """)
-
-            # applications table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS applications (
-                    id SERIAL PRIMARY KEY,
-                    company VARCHAR(30) NOT NULL,
-                    role VARCHAR(30) NOT NULL,
-                    status VARCHAR(30) NOT NULL,
-                    updates TEXT,
-                    notes TEXT,
-                    user_id INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-
-            conn.commit()
-
-# initialize database before first request
-init_db()
+# app factory: cheap to call, no database or SMTP work happens here
+def create_app():
+    # environment variables (.env included) are loaded by db on import
+
+    app = PrecompressedFlask(__name__)
+    app.secret_key = "ILoveDucks"
+
+    # gzip/brotli responses, versioned long-lived static files
+    app.after_request(compress_response)
+    app.add_template_global(static_url)
+
+    # configure Flask-Mail (initialized on first use, see get_mail)
+    # (server can be overridden, e.g. to point at a local SMTP stand-in for load tests)
+    app.config["MAIL_SERVER"] = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+    app.config["MAIL_PORT"] = int(os.getenv("MAIL_PORT", 465))
+    app.config["MAIL_USE_TLS"] = False
+    app.config["MAIL_USE_SSL"] = os.getenv("MAIL_USE_SSL", "true").lower() == "true"
+    app.config["MAIL_USERNAME"] = os.getenv('MAIL_USERNAME')
+    app.config["MAIL_PASSWORD"] = os.getenv('MAIL_PASSWORD')    # no hacking!
+    app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_USERNAME")
+
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(shards_cli)
+    app.cli.add_command(maintenance_cli)
+    app.cli.add_command(sync_replicas_command)
+    app.cli.add_command(compress_static_command)
+    return app
+
+# one-time schema migration: `flask --app app init-db`
+@click.command("init-db")
+def init_db_command():
+    init_db()
+    click.echo("Database initialized.")
+
+# local stand-in for replication: `flask --app app sync-replicas` copies the SQLite files to REPLICA_URLS
+@click.command("sync-replicas")
+def sync_replicas_command():
+    if os.environ.get("DATABASE_URL"):
+        raise click.UsageError("PostgreSQL replicas are kept up to date by the database server.")
+    for replica in sync_sqlite_replicas():
+        click.echo(f"Copied databases to {replica}/")
+
+# Flask-Mail is only imported and set up when an email is actually sent
+def get_mail():
+    if "mail" not in current_app.extensions:
+        from flask_mail import Mail
+        Mail(current_app._get_current_object())  # registers itself in app.extensions
+    return current_app.extensions["mail"]
+
+# import lazily loaded modules up front without touching the network.
+# called in the gunicorn master when preloading, so forked workers share them
+def warm_up():
+    preload_driver()
+    import flask_mail  # noqa: F401
+    import analytics  # noqa: F401
 
 # receive user settings from cookies
 def get_user_settings():
@@ -137,129 +110,85 @@ def get_user_settings():
 
     return auto_no_response, no_response_days, inactive_bottom, email_no_response, email_address
 
-# convert any updates input into a list
-def parse_updates(input):
-    if not input:
-        return []
-    if isinstance(input, list):
-        return input  # already parsed
-    if isinstance(input, str):
-        try:
-            return json.loads(input)
-        except json.JSONDecodeError:
-            pass
-    return []
-
-# parse dates
-def parse_date(date_str, as_datetime=True):
-    """Parse a date string in various formats.
-    Returns datetime by default, or formatted string if as_datetime=False."""
-    for fmt in (
-        "%d-%m-%Y", "%Y-%m-%d",
-        "%d/%m/%Y", "%Y/%m/%d",
-        "%d.%m.%Y", "%Y.%m.%d",
-        "%d %m %Y", "%Y %m %d",
-        "%d%m%Y", "%Y%m%d"
-    ):
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt if as_datetime else dt.strftime(DATE_FORMAT)
-        except (ValueError, TypeError):
-            continue
-    # fallback to today's date
-    dt = datetime.now()
-    return dt if as_datetime else dt.strftime(DATE_FORMAT)
-
 # auto update no response
-def update_no_response(applications, no_response_days, email_no_response=None, email_address=None):
+# decides in the request (so the page shows the new updates right away),
+# the database writes and emails are handed off to a background task
+def update_no_response(user_id, applications, no_response_days, email_no_response=None, email_address=None):
     today = datetime.now()
-    with get_conn() as conn:
+    changes = []
+
+    for app in applications:
+        updates = app["updates"]
+        if not updates:
+            continue
+
+        last_update = updates[-1]
+        last_status = last_update.get("status")
+        last_date = parse_date(last_update.get("date"))
+        days_diff = (today - last_date).days
+
+        if days_diff > no_response_days and last_status not in ["No Response", "Rejected"]:
+            old_updates = json.dumps(updates)
+            # append No Response update
+            updates.append({"status": "No Response", "date": today.strftime(DATE_FORMAT)})
+            changes.append((app["id"], old_updates, json.dumps(updates), app["company"], app["role"], days_diff))
+
+    if not changes:
+        return
+
+    # --- email does not work with Render ---
+    send_emails = email_no_response == "true" and email_address and not os.environ.get("DATABASE_URL")
+    run_in_background(save_no_response, user_id, changes, email_address if send_emails else None)
+
+# background part of update_no_response: save all changes in one transaction, then send emails.
+# rows are only updated if their updates are unchanged since the request read them, so a
+# sweep that raced with another one (or with a user edit) doesn't write or email twice
+def save_no_response(user_id, changes, email_address=None):
+    saved = []
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-
-        for app in applications:
-            updates = parse_updates(app["updates"])
-            if not updates:
-                continue
-
-            last_update = updates[-1]
-            last_status = last_update.get("status")
-            last_date = parse_date(last_update.get("date"))
-            days_diff = (today - last_date).days
-
-            if days_diff > no_response_days and last_status not in ["No Response", "Rejected"]:
-                # append No Response update
-                updates.append({"status": "No Response", "date": today.strftime(DATE_FORMAT)})
-                new_updates = json.dumps(updates)
-                # update in database
-                cur.execute(f"UPDATE applications SET status = {p}, updates = {p} WHERE id = {p}", 
-                            ("No Response", new_updates, app["id"]))
-                conn.commit()
-
-                # send email
-                if email_no_response == "true" and email_address:
-                    # --- email does not work with Render ---
-                    if p == "?":
-                        subject = f"Job Tracker Update"
-                        body_html = f"""
-                            <p>Hello, your application to <strong>{app['company']}</strong> for the role of <strong>{app['role']}</strong>
-                            has been marked as 'No Response' after {days_diff} days without updates.</p>
-
-                            <hr>
-                            <p style="font-family: monospace; font-size: 1.2em; color: #555;">
-                            This is an automated message from the "Job Tracker" app,
-                            made by <a href="https://www.linkedin.com/in/ido-hassidim-12705125b/" target="_blank">Ido Hassidim</a>
-                            </p>
-                            """
-                        try:
-                            msg = Message(subject, recipients=[email_address], html=body_html)
-                            mail.send(msg)
-                        except Exception as e:
-                            print(f"Error sending email: {e}")
+        for app_id, old_updates, new_updates, company, role, days_diff in changes:
+            cur.execute(f"UPDATE applications SET status = {p}, updates = {p} WHERE id = {p} AND user_id = {p} AND updates = {p}",
+                        ("No Response", new_updates, app_id, user_id, old_updates))
+            if cur.rowcount:
+                saved.append((company, role, days_diff))
+
+    if email_address:
+        for company, role, days_diff in saved:
+            send_no_response_email(email_address, company, role, days_diff)
+
+# email about an application marked as 'No Response'
+def send_no_response_email(email_address, company, role, days_diff):
+    subject = f"Job Tracker Update"
+    body_html = f"""
+        <p>Hello, your application to <strong>{company}</strong> for the role of <strong>{role}</strong>
+        has been marked as 'No Response' after {days_diff} days without updates.</p>
+
+        <hr>
+        <p style="font-family: monospace; font-size: 1.2em; color: #555;">
+        This is an automated message from the "Job Tracker" app,
+        made by <a href="https://www.linkedin.com/in/ido-hassidim-12705125b/" target="_blank">Ido Hassidim</a>
+        </p>
+        """
+    try:
+        mail = get_mail()
+        from flask_mail import Message
+        msg = Message(subject, recipients=[email_address], html=body_html)
+        mail.send(msg)
+    except Exception as e:
+        print(f"Error sending email: {e}")
 
 # data for pie chart
 def get_chart1_data(applications):
     status_data = Counter(app["status"] for app in applications)
     return status_data
 
-# data for bar chart
-def get_chart2_data(applications):
-    # extract 'applied' dates from updates (bar chart)
-    applied_dates = []
-    for app in applications:
-        updates = parse_updates(app["updates"])
-
-        if updates and updates[0]["status"] == "Applied":
-            applied_date = parse_date(updates[0]["date"])
-            applied_dates.append(applied_date)
-
-    # count applications per week
-    week_counts = Counter()
-    for date in applied_dates:
-        days_to_sunday = (date.weekday() + 1) % 7
-        week_start = date - timedelta(days=days_to_sunday)
-        week_str = week_start.strftime("%d-%m-%Y")
-        week_counts[week_str] += 1
-
-    # sort by ascending week dates
-    week_counts = dict(sorted(week_counts.items(), key=lambda x: parse_date(x[0])))
-
-    # each week label and amount of applications in it
-    week_labels = []
-    week_values = []
-    for i, (week_str, count) in enumerate(week_counts.items(), start=1):
-        week_labels.append(f"Week {i}")
-        week_values.append(count)
-    # week date ranges
-    week_ranges = []
-    for week_str in week_counts.keys():
-        week_start = parse_date(week_str)
-        week_end = week_start + timedelta(days=6)
-        week_ranges.append(f"{week_start.strftime('%d/%m')} → {week_end.strftime('%d/%m')}")
-
-    # combine all data into a single list
-    week_data = list(zip(week_labels, week_values, week_ranges))
-    return week_data
+# data for bar chart: applications (and responses) per week, empty weeks included
+def get_chart2_data(applications, granularity="week", start=None, end=None):
+    from analytics import event_ordinals, timeseries  # numpy is imported on first use
+    applied, responses = event_ordinals(app["updates"] for app in applications)
+    return timeseries(applied, responses, granularity, start, end)
 
 # total amount of applications for specific user
 def total_applications(applications):
@@ -269,8 +198,7 @@ def total_applications(applications):
 def apps_in_process(applications):
     count = 0
     for app in applications:
-        updates = parse_updates(app["updates"])
-        for upd in updates:
+        for upd in app["updates"]:
             if upd["status"] == "Rejected" or upd["status"] == "No Response":
                 count += 1
                 break
@@ -282,11 +210,7 @@ def apps_in_process(applications):
 def avg_first_response_time(applications):
     diffs = []
     for app in applications:
-        # skip if no updates
-        if not app["updates"]:
-            continue
-
-        updates = parse_updates(app["updates"])
+        updates = app["updates"]
         # not enough info
         if len(updates) < 2:
             continue
@@ -342,17 +266,16 @@ def rejection_percentage(applications):
 
 # add application without html form
 def add_app(company, role, status, updates, notes, user_id):
-    with get_conn() as conn:
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
         cur.execute(
             f"INSERT INTO applications (company, role, status, updates, notes, user_id) VALUES ({p}, {p}, {p}, {p}, {p}, {p})",
             (company, role, status, updates, notes, user_id)
         )
-        conn.commit()
 
 # homepage
-@app.route("/") 
+@bp.route("/") 
 def home():
     # logged in user gets id
     if "user_id" not in session:
@@ -365,7 +288,7 @@ def home():
     auto_no_response, no_response_days, inactive_bottom, email_no_response, email_address = get_user_settings()
 
     if request.args.get("reset") == "1":
-        return redirect(url_for("home"))
+        return redirect(url_for("main.home"))
     else:
         # get filter, sort, order and search options from URL parameters
         status_filter = request.args.get("status_filter")   # filter by status
@@ -377,7 +300,7 @@ def home():
 
     # auto update no response statuses
     if auto_no_response:    # skip if disabled
-        update_no_response(applications, no_response_days, email_no_response, email_address)
+        update_no_response(user_id, applications, no_response_days, email_no_response, email_address)
 
     # inactive at bottom
     if inactive_bottom:
@@ -391,7 +314,7 @@ def home():
     status_data = get_chart1_data(applications)
 
     # bar chart data
-    week_data = get_chart2_data(applications)
+    time_series = get_chart2_data(applications)
 
     stats = {
         "Total applications": total_applications(applications),
@@ -403,20 +326,59 @@ def home():
 
     return render_template(
         "home.html", 
-        applications=applications, 
         status_filter=status_filter,
         sort=sort,
         order=order,
         search=search,
-        status_data=status_data,
-        week_data=week_data,
+        dashboard_data=get_dashboard_data(applications, status_data, time_series),
         stats=stats,
         username=username
     )
 
+# everything home.js needs to render the table and charts, as one compact JSON payload
+def get_dashboard_data(applications, status_data, time_series):
+    return {
+        # [id, company, role, status, notes, [[status, date], ...]]
+        "rows": [
+            [app.id, app.company, app.role, app.status, app.notes or "",
+             [[upd.get("status"), upd.get("date")] for upd in app.updates]]
+            for app in applications
+        ],
+        "statusData": status_data,
+        "timeSeries": time_series,
+        # row forms post to these prefixes + application id
+        "urls": {
+            endpoint: url_for(f"main.{endpoint}", app_id=0)[:-1]
+            for endpoint in ("update_status", "update_notes", "update_updates", "delete_application", "duplicate_application")
+        } | {"timeseries": url_for("main.timeseries_data"), "funnel": url_for("main.funnel_data")},
+    }
+
+# applications/responses over time as JSON, for the bar chart granularity and range controls
+# ?granularity=day|week|month&start=YYYY-MM-DD&end=YYYY-MM-DD, plus the table's status_filter/search
+@bp.route("/analytics/timeseries")
+def timeseries_data():
+    if "user_id" not in session:
+        return jsonify(error="Not logged in"), 401
+    from analytics import timeseries_args
+
+    applications = get_applications(session["user_id"], request.args.get("status_filter"), search=request.args.get("search"))
+    try:
+        return jsonify(get_chart2_data(applications, *timeseries_args(request.args)))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+# stage funnel, time in stage and response times over all of the user's applications as JSON,
+# cached until their data changes (see analytics.user_funnel)
+@bp.route("/analytics/funnel")
+def funnel_data():
+    if "user_id" not in session:
+        return jsonify(error="Not logged in"), 401
+    from analytics import user_funnel
+    return jsonify(user_funnel(session["user_id"]))
+
 # fetch all entries from database and apply filters, sorting, searching
 def get_applications(user_id, status_filter=None, sort=None, order=None, search=None):
-    with get_conn() as conn:
+    with get_conn(user_id, readonly=True) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
 
@@ -455,39 +417,21 @@ def get_applications(user_id, status_filter=None, sort=None, order=None, search=
         cur.execute(base_query, params)
         rows = cur.fetchall()
 
-        applications = [
-            {
-                "id": row[0], 
-                "company": row[1],
-                "role": row[2],
-                "status": row[3],
-                "updates": parse_updates(row[4]),
-                "notes": row[5]
-            }
-            for row in rows
-        ]
+        # updates are decoded lazily, only if something reads them
+        applications = [ApplicationRecord(*row) for row in rows]
 
         return applications
     
 # fetch all entries from database, returns as list of dicts
 def get_user_apps(user_id):
-    with get_conn() as conn:
+    with get_conn(user_id, readonly=True) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
         cur.execute(f"SELECT id, company, role, status, updates, notes FROM applications WHERE user_id = {p}", (user_id,))
         rows = cur.fetchall()
 
-        applications = [
-            {
-                "id": row[0], 
-                "company": row[1],
-                "role": row[2],
-                "status": row[3],
-                "updates": parse_updates(row[4]),
-                "notes": row[5]
-            }
-            for row in rows
-        ]
+        # updates are decoded lazily, only if something reads them
+        applications = [ApplicationRecord(*row) for row in rows]
 
         return applications
 
@@ -496,36 +440,34 @@ def init_updates(status, date):
     return json.dumps([{"status": status, "date": date}])
 
 # add update line to existing updates
-def add_update(app_id, status, date):
-    with get_conn() as conn:
+def add_update(app_id, status, date, user_id):
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        cur.execute(f"SELECT updates FROM applications WHERE id = {p}", (app_id,))
+        cur.execute(f"SELECT updates FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
         row = cur.fetchone()
         updates = json.loads(row[0]) if row and row[0] else []
         updates.append({"status": status, "date": date})
-        cur.execute(f"UPDATE applications SET updates = {p} WHERE id = {p}", (json.dumps(updates), app_id))
-        conn.commit()
+        cur.execute(f"UPDATE applications SET updates = {p} WHERE id = {p} AND user_id = {p}", (json.dumps(updates), app_id, user_id))
 
 # sort updates by date descending
-def sort_updates(app_id):
-    with get_conn() as conn:
+def sort_updates(app_id, user_id):
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        cur.execute(f"SELECT updates FROM applications WHERE id = {p}", (app_id,))
+        cur.execute(f"SELECT updates FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
         row = cur.fetchone()
         updates = json.loads(row[0]) if row and row[0] else []
         # sort by date ascending
         updates.sort(key=lambda x: parse_date(x["date"]))
-        cur.execute(f"UPDATE applications SET updates = {p} WHERE id = {p}", (json.dumps(updates), app_id))
-        conn.commit()
+        cur.execute(f"UPDATE applications SET updates = {p} WHERE id = {p} AND user_id = {p}", (json.dumps(updates), app_id, user_id))
 
 # return applied date
-def get_apply_date(app_id):
-    with get_conn() as conn:
+def get_apply_date(app_id, user_id):
+    with get_conn(user_id, readonly=True) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        cur.execute(f"SELECT updates FROM applications WHERE id = {p}", (app_id,))
+        cur.execute(f"SELECT updates FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
         row = cur.fetchone()
         first_update = json.loads(row[0]) if row and row[0] else []
         if first_update and first_update[0]["status"] == "Applied":
@@ -534,7 +476,7 @@ def get_apply_date(app_id):
     return None # no apply date found
 
 # add new entry to database
-@app.route("/add", methods=["POST"])
+@bp.route("/add", methods=["POST"])
 def add_application():
     if "user_id" not in session:
         return redirect("/login")
@@ -554,38 +496,36 @@ def add_application():
     updates = init_updates("Applied", date_applied)
 
     if company and role:
-        with get_conn() as conn:
+        with get_conn(user_id) as conn:
             cur = conn.cursor()
             p = "%s" if os.environ.get("DATABASE_URL") else "?"
             cur.execute(
                 f"INSERT INTO applications (company, role, status, updates, notes, user_id) VALUES ({p}, {p}, {p}, {p}, {p}, {p})",
                 (company, role, "Applied", updates, "", user_id)
             ) 
-            conn.commit()
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # delete entry from database
-@app.route("/delete/<int:app_id>", methods=["POST"])
+@bp.route("/delete/<int:app_id>", methods=["POST"])
 def delete_application(app_id):
     if "user_id" not in session:
         return redirect("/login")
     
     user_id = session["user_id"]
     
-    with get_conn() as conn:
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
         cur.execute(f"DELETE FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
-        conn.commit()
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # duplicate entry in database
-@app.route("/duplicate/<int:app_id>", methods=["POST"])
+@bp.route("/duplicate/<int:app_id>", methods=["POST"])
 def duplicate_application(app_id):
-    with get_conn() as conn:
+    user_id = session.get("user_id")
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        user_id = session.get("user_id")
         # fetch the application to duplicate
         cur.execute(f"SELECT company, role, status, updates, notes FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
         row = cur.fetchone()
@@ -596,42 +536,42 @@ def duplicate_application(app_id):
                 f"INSERT INTO applications (company, role, status, updates, notes, user_id) VALUES ({p}, {p}, {p}, {p}, {p}, {p})",
                 (company, role, status, updates, notes, user_id)
             )
-            conn.commit()
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # update status of an entry and append to updates
-@app.route("/update/<int:app_id>", methods=["POST"])
+@bp.route("/update/<int:app_id>", methods=["POST"])
 def update_status(app_id):
+    user_id = session.get("user_id")
     new_status = request.form.get("status")
 
     if new_status:
         date_now = datetime.now().strftime(DATE_FORMAT)
-        add_update(app_id, new_status, date_now)
-        sort_updates(app_id)
+        add_update(app_id, new_status, date_now, user_id)
+        sort_updates(app_id, user_id)
 
-        with get_conn() as conn:
+        with get_conn(user_id) as conn:
             cur = conn.cursor()
             p = "%s" if os.environ.get("DATABASE_URL") else "?"
-            cur.execute(f"UPDATE applications SET status = {p} WHERE id = {p}", (new_status, app_id))
-            conn.commit()
+            cur.execute(f"UPDATE applications SET status = {p} WHERE id = {p} AND user_id = {p}", (new_status, app_id, user_id))
 
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # update notes of an entry
-@app.route("/update_notes/<int:app_id>", methods=["POST"])
+@bp.route("/update_notes/<int:app_id>", methods=["POST"])
 def update_notes(app_id):
+    user_id = session.get("user_id")
     new_notes = request.form.get("notes")
-    with get_conn() as conn:
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        cur.execute(f"UPDATE applications SET notes = {p} WHERE id = {p}", (new_notes, app_id))
-        conn.commit()
+        cur.execute(f"UPDATE applications SET notes = {p} WHERE id = {p} AND user_id = {p}", (new_notes, app_id, user_id))
 
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # update updates of an entry
-@app.route("/update_updates/<int:app_id>", methods=["POST"])
+@bp.route("/update_updates/<int:app_id>", methods=["POST"])
 def update_updates(app_id):
+    user_id = session.get("user_id")
     # get lists from the form
     statuses = request.form.getlist("status")
     dates = request.form.getlist("date")
@@ -647,24 +587,23 @@ def update_updates(app_id):
     updates_list.sort(key=lambda x: parse_date(x["date"]))
 
     # fetch current updates
-    with get_conn() as conn:
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        cur.execute(f"SELECT updates FROM applications WHERE id = {p}", (app_id,))
+        cur.execute(f"SELECT updates FROM applications WHERE id = {p} AND user_id = {p}", (app_id, user_id))
         # save to database
         cur.execute(
-            f"UPDATE applications SET updates = {p} WHERE id = {p}",
-            (json.dumps(updates_list), app_id)
+            f"UPDATE applications SET updates = {p} WHERE id = {p} AND user_id = {p}",
+            (json.dumps(updates_list), app_id, user_id)
         )
-        conn.commit()
 
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 # backup database
-@app.route("/backup")
+@bp.route("/backup")
 def backup():
     applications = get_user_apps(session["user_id"])
-    json_data = json.dumps(applications, indent=4)
+    json_data = json.dumps(applications, indent=4, default=ApplicationRecord.to_dict)
     return Response(
         json_data, 
         mimetype="application/json",
@@ -672,7 +611,7 @@ def backup():
     )
 
 # export database to CSV
-@app.route("/export_csv")
+@bp.route("/export_csv")
 def export_csv():
     applications = get_user_apps(session["user_id"])
     output = StringIO()
@@ -701,21 +640,20 @@ def export_csv():
     )
 
 # restore database from backup or merge with existing data
-@app.route("/merge_restore", methods=["POST"])
+@bp.route("/merge_restore", methods=["POST"])
 def merge_restore():
     file = request.files['file']
     data = json.load(file)  # list of dicts with original ids
     mode = request.form.get("backup_mode")  # 'restore' or 'merge'
+    user_id = session.get("user_id")
 
-    with get_conn() as conn:
+    with get_conn(user_id) as conn:
         cur = conn.cursor()
         p = "%s" if os.environ.get("DATABASE_URL") else "?"
-        user_id = session.get("user_id")
 
         if mode == "restore":
             # WARNING: wipe current user data
             cur.execute(f"DELETE FROM applications WHERE user_id = {p}", (user_id,))
-            conn.commit()
 
             # insert backup apps with new IDs
             for app in data:
@@ -731,7 +669,6 @@ def merge_restore():
                      app.get("notes", ""), 
                      user_id)
                 )
-            conn.commit()
 
         elif mode == "merge":
             # fetch existing user applications
@@ -747,7 +684,6 @@ def merge_restore():
 
             # clear current user data and insert combined list
             cur.execute(f"DELETE FROM applications WHERE user_id = {p}", (user_id,))
-            conn.commit()
 
             for app in combined_apps:
                 # give new IDs to all apps
@@ -763,12 +699,19 @@ def merge_restore():
                      app.get("notes", ""), 
                      user_id)
                 )
-            conn.commit()
 
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 
-@app.route("/register", methods=["GET", "POST"])
+# keep last_seen current while a user is signed in, at most one write per LAST_SEEN_INTERVAL
+@bp.before_app_request
+def record_last_seen():
+    user_id = session.get("user_id")
+    if user_id is not None and not seen_recently():
+        with get_conn() as conn:
+            set_last_seen(conn.cursor(), user_id)
+
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     # user submitted registration form (POST)
     if (request.method == "POST"):
@@ -798,20 +741,24 @@ def register():
                     cur.execute(f"INSERT into users (username, password) VALUES ({p}, {p})", 
                                 (username, password))
                     user_id = cur.lastrowid
-                conn.commit()
-                # store user id in session
-                session["user_id"] = user_id
-                session["username"] = username
-                return redirect(url_for("home"))
-            
-            except Exception as e:
+            except integrity_errors():
+                # only the username is unique, other errors (e.g. a missing table) surface
                 return render_template("register.html", error="Username taken")
+
+            # choose the shard for the user's applications
+            assign_shard(cur, user_id)
+            set_last_seen(cur, user_id)
+            conn.commit()
+            # store user id in session
+            session["user_id"] = user_id
+            session["username"] = username
+            return redirect(url_for("main.home"))
     # user opens registeration page (GET) 
     else:
         return render_template("register.html")
 
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     # user submitted login form (POST)
     if (request.method == "POST"):
@@ -827,9 +774,10 @@ def login():
             
             if (user_data):
                 # user exists
+                set_last_seen(cur, user_data[0])
                 session["user_id"] = user_data[0]   # id from users
                 session["username"] = username
-                return redirect(url_for("home"))
+                return redirect(url_for("main.home"))
             else:
                 # user doesn't exist or wrong password
                 return render_template("login.html", error="Invalid username or password")
@@ -838,44 +786,78 @@ def login():
         return render_template("login.html")
     
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.clear() # remove user_id, username, etc.
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
 
-@app.route("/admin")
+@bp.route("/admin")
 def admin():
-    return render_template("admin.html")
+    return render_template(
+        "admin.html",
+        rollups=load_rollups(),
+        jobs=[job_summary(job) for job in recent_jobs()],
+        job_kinds={kind: label for kind, (label, _, _) in JOB_KINDS.items()},
+        inactive_days=INACTIVE_DAYS
+    )
 
-@app.route("/admin/delete_all", methods=["POST"])
+# progress of recent maintenance jobs, polled by the admin page
+@bp.route("/admin/jobs")
+def admin_jobs():
+    return jsonify([job_summary(job) for job in recent_jobs()])
+
+# start a maintenance job; it runs in bounded batches in the background
+@bp.route("/admin/jobs", methods=["POST"])
+def admin_start_job():
+    kind = request.form.get("kind")
+    params = {"days": int(request.form.get("days") or INACTIVE_DAYS)} if kind == "purge_inactive" else {}
+    try:
+        job_id = create_job(kind, **params)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    run_job_in_background(run_job, job_id)
+    return redirect(url_for("main.admin"))
+
+@bp.route("/admin/jobs/<int:job_id>/pause", methods=["POST"])
+def admin_pause_job(job_id):
+    pause_job(job_id)
+    return redirect(url_for("main.admin"))
+
+# continue a paused, failed or stalled job from its last finished batch
+@bp.route("/admin/jobs/<int:job_id>/resume", methods=["POST"])
+def admin_resume_job(job_id):
+    run_job_in_background(run_job, job_id, resume=True)
+    return redirect(url_for("main.admin"))
+
+# applications/responses over time across all users, same parameters as /analytics/timeseries
+@bp.route("/admin/analytics/timeseries")
+def admin_timeseries_data():
+    from analytics import event_ordinals, iter_all_updates, timeseries, timeseries_args
+    try:
+        granularity, start, end = timeseries_args(request.args)
+        applied, responses = event_ordinals(iter_all_updates())
+        return jsonify(timeseries(applied, responses, granularity, start, end))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+# deleting everything runs as a chunked job (see maintenance.py) instead of one statement
+# that would hold the tables locked for the whole deletion
+@bp.route("/admin/delete_all", methods=["POST"])
 def admin_delete_all_apps():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM applications")
-        conn.commit()
-    return redirect("admin.html")
+    run_job_in_background(run_job, create_job("delete_applications"))
+    return redirect(url_for("main.admin"))
 
-@app.route("/admin/delete_all_users", methods=["POST"])
+@bp.route("/admin/delete_all_users", methods=["POST"])
 def admin_delete_all_users():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM users")
-        conn.commit()
-    return redirect("admin.html")
+    run_job_in_background(run_job, create_job("delete_users"))
+    return redirect(url_for("main.admin"))
 
-@app.route("/admin/logout", methods=["POST"])
+@bp.route("/admin/logout", methods=["POST"])
 def admin_logout():
     session.clear()
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
-@app.template_filter('format_date_for_input')
-def format_date_for_input(date_str):
-    """convert DD/MM/YYYY -> YYYY-MM-DD for input type=date"""
-    if not date_str:
-        return ''
-    try:
-        day, month, year = date_str.split('/')
-        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-    except Exception:
-        return ''
\ No newline at end of file
+
+# module level app for `flask run` and `gunicorn app:app`
+app = create_app()
@@ -0,0 +1,374 @@
+"""Local load test for the Job Tracker gunicorn deployment.
+
+Starts `gunicorn app:app` against a throwaway SQLite database and a local SMTP
+stand-in, logs in many synthetic users and mixes dashboard views, searches,
+status updates and exports. Reports throughput, p50/p95/p99 latency and error
+rates for every workers x threads combination.
+
+    python bench/loadtest.py --workers 1,2,4 --threads 1,4 --users 50 --duration 30
+    python bench/loadtest.py --url http://127.0.0.1:5000 --users 20   # existing server
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.cookiejar import Cookie, CookieJar
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# action name -> weight in the traffic mix
+ACTIONS = {
+    "dashboard": 50,
+    "search": 20,
+    "update_status": 15,
+    "export_csv": 10,
+    "backup": 5,
+}
+STATUSES = ["OA1", "Interview1", "HR Interview", "Offer", "Rejected"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka"]
+ROLES = ["Backend Engineer", "Data Analyst", "QA Engineer", "DevOps", "Frontend Engineer"]
+
+
+# --- local SMTP stand-in ---
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for Flask-Mail and throws the messages away."""
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        self.reply("220 loadtest SMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith("EHLO"):
+                self.reply("250-loadtest")
+                self.reply("250 OK")
+            elif cmd == "DATA":
+                self.reply("354 end with <CR><LF>.<CR><LF>")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                self.server.messages += 1
+                self.reply("250 queued")
+            elif cmd == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                # HELO, MAIL FROM, RCPT TO, RSET, NOOP...
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.messages = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# --- HTTP client ---
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # the app answers every POST with a redirect; measure the POST itself
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualUser:
+    def __init__(self, base_url, username, password="loadtest"):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect()
+        )
+        self.app_ids = []
+
+    def request(self, path, data=None):
+        """Returns (status, body). Redirects count as success."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(self.base_url + path, body, timeout=60) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def set_cookie(self, name, value):
+        host = urllib.parse.urlparse(self.base_url).hostname
+        self.cookies.set_cookie(Cookie(
+            0, name, value, None, False, host, False, False, "/", True,
+            False, None, False, None, None, {}
+        ))
+
+    # create account and seed applications; some are old enough for the 'No Response' sweep
+    def setup(self, apps_per_user):
+        self.request("/register", {
+            "username": self.username,
+            "password": self.password,
+            "confirm_password": self.password,
+        })
+        self.request("/login", {"username": self.username, "password": self.password})
+        # settings normally synced to cookies by the dashboard javascript
+        self.set_cookie("autoNoResponse", "true")
+        self.set_cookie("noResponseDays", "14")
+        self.set_cookie("emailNoResponse", "true")
+        self.set_cookie("emailAddress", f"{self.username}@example.com")
+
+        for i in range(apps_per_user):
+            applied = datetime.now() - timedelta(days=random.randint(0, 60))
+            self.request("/add", {
+                "company": random.choice(COMPANIES),
+                "role": random.choice(ROLES),
+                "date_applied": applied.strftime("%Y-%m-%d"),
+            })
+
+        status, body = self.request("/backup")
+        if status == 200:
+            self.app_ids = [app["id"] for app in json.loads(body)]
+
+    def run_action(self, action):
+        if action == "dashboard":
+            return self.request("/")
+        if action == "search":
+            return self.request("/?" + urllib.parse.urlencode({"search": random.choice(COMPANIES)[:3]}))
+        if action == "update_status":
+            if not self.app_ids:
+                return self.request("/")
+            app_id = random.choice(self.app_ids)
+            return self.request(f"/update/{app_id}", {"status": random.choice(STATUSES)})
+        if action == "export_csv":
+            return self.request("/export_csv")
+        if action == "backup":
+            return self.request("/backup")
+        raise ValueError(action)
+
+
+# --- gunicorn process ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/login", timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up in {timeout}s")
+
+
+def start_gunicorn(app_spec, workers, threads, smtp_port, workdir, preload=True, async_workers=False, shards=1):
+    port = free_port()
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)   # always SQLite (databases.db inside workdir)
+    env.update({
+        "MIGRATE_ON_START": "true",     # fresh database needs its tables
+        "GUNICORN_PRELOAD": "true" if preload else "false",
+        "ASYNC_WORKERS": "true" if async_workers else "false",
+        "SHARD_COUNT": str(shards),
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(smtp_port),
+        "MAIL_USE_SSL": "false",
+        "MAIL_USERNAME": "loadtest@example.com",
+    })
+    cmd = [
+        sys.executable, "-m", "gunicorn", app_spec,
+        "--config", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--pythonpath", REPO_ROOT,
+        "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(url)
+    except RuntimeError:
+        proc.terminate()
+        raise
+    return proc, url
+
+
+# --- measurement ---
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, elapsed):
+    """samples: list of (action, latency_seconds, ok)"""
+    by_action = defaultdict(list)
+    for action, latency, ok in samples:
+        by_action[action].append((latency, ok))
+        by_action["ALL"].append((latency, ok))
+
+    summary = {}
+    for action, results in by_action.items():
+        latencies = sorted(lat for lat, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        summary[action] = {
+            "requests": len(results),
+            "rps": len(results) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(results),
+        }
+    return summary
+
+
+def run_scenario(base_url, users, apps_per_user, duration, seed):
+    random.seed(seed)
+    run_id = f"{int(time.time())}{random.randint(0, 9999)}"
+    vusers = [VirtualUser(base_url, f"lt{run_id}_{i}") for i in range(users)]
+
+    # setup in parallel so large user counts don't take forever
+    setup_threads = [threading.Thread(target=u.setup, args=(apps_per_user,)) for u in vusers]
+    for t in setup_threads:
+        t.start()
+    for t in setup_threads:
+        t.join()
+
+    samples = []
+    lock = threading.Lock()
+    names = list(ACTIONS)
+    weights = list(ACTIONS.values())
+    deadline = time.monotonic() + duration
+
+    def worker(vuser, rng):
+        local = []
+        while time.monotonic() < deadline:
+            action = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = vuser.run_action(action)
+                ok = status < 400
+            except Exception:
+                ok = False
+            local.append((action, time.perf_counter() - start, ok))
+        with lock:
+            samples.extend(local)
+
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=worker, args=(u, random.Random(seed + i)))
+        for i, u in enumerate(vusers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    return summarize(samples, elapsed)
+
+
+def print_summary(title, summary, emails=None):
+    print(f"\n== {title} ==")
+    if emails is not None:
+        print(f"emails delivered to SMTP stand-in: {emails}")
+    print(f"{'action':<14}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for action in ["ALL"] + [a for a in ACTIONS if a in summary]:
+        if action not in summary:
+            continue
+        s = summary[action]
+        print(f"{action:<14}{s['requests']:>10}{s['rps']:>10.1f}{s['p50_ms']:>10.1f}"
+              f"{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['error_rate']:>8.1%}")
+
+
+def parse_counts(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load test an already running server instead of starting gunicorn")
+    parser.add_argument("--app", default="app:app", help="gunicorn app spec (default: app:app)")
+    parser.add_argument("--workers", type=parse_counts, default=[1, 2], help="comma separated, e.g. 1,2,4")
+    parser.add_argument("--threads", type=parse_counts, default=[1], help="comma separated, e.g. 1,4")
+    parser.add_argument("--users", type=int, default=20, help="concurrent synthetic users")
+    parser.add_argument("--apps-per-user", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic per configuration")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="import the app in every worker instead of once in the master")
+    parser.add_argument("--async", dest="async_workers", action="store_true",
+                        help="use gevent workers (--threads is then ignored by gunicorn)")
+    parser.add_argument("--shards", type=int, default=1, help="SHARD_COUNT for the server (SQLite files)")
+    parser.add_argument("--json", dest="json_out", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.url:
+        summary = run_scenario(args.url.rstrip("/"), args.users, args.apps_per_user, args.duration, args.seed)
+        print_summary(args.url, summary)
+        results.append({"url": args.url, "users": args.users, "summary": summary})
+    else:
+        for workers in args.workers:
+            for threads in args.threads:
+                smtp = SMTPSink().start()
+                with tempfile.TemporaryDirectory(prefix="jobtracker-loadtest-") as workdir:
+                    proc, url = start_gunicorn(
+                        args.app, workers, threads, smtp.port, workdir, args.preload, args.async_workers, args.shards
+                    )
+                    try:
+                        summary = run_scenario(url, args.users, args.apps_per_user, args.duration, args.seed)
+                    finally:
+                        proc.terminate()
+                        proc.wait(timeout=30)
+                smtp.shutdown()
+                smtp.server_close()
+                mode = "gevent" if args.async_workers else f"threads={threads}"
+                title = f"workers={workers} {mode} shards={args.shards} users={args.users}"
+                print_summary(title, summary, smtp.messages)
+                results.append({
+                    "workers": workers,
+                    "threads": threads,
+                    "async": args.async_workers,
+                    "shards": args.shards,
+                    "users": args.users,
+                    "emails": smtp.messages,
+                    "summary": summary,
+                })
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Memory and allocations of the application rows the dashboard works with.
+
+Seeds a throwaway SQLite database with one large account, then measures with
+tracemalloc:
+  - fetch: get_applications() only (callers that never look at update history)
+  - dashboard: fetch + 'No Response' sweep check + charts + stats, as in home()
+
+    python bench/rows.py --rows 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ["OA1", "Interview1", "HR Interview", "Offer", "Rejected"]
+
+
+def seed(rows):
+    from db import get_conn, init_db
+    init_db()
+    rng = random.Random(1)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')")
+        user_id = cur.lastrowid
+        data = []
+        for i in range(rows):
+            day = datetime.now() - timedelta(days=rng.randint(0, 365))
+            updates = [{"status": "Applied", "date": day.strftime("%d/%m/%Y")}]
+            for status in rng.sample(STATUSES, rng.randint(0, 3)):
+                day += timedelta(days=rng.randint(1, 20))
+                updates.append({"status": status, "date": day.strftime("%d/%m/%Y")})
+            data.append((f"Company {i}", "Engineer", updates[-1]["status"], json.dumps(updates), "", user_id))
+        cur.executemany(
+            "INSERT INTO applications (company, role, status, updates, notes, user_id) VALUES (?, ?, ?, ?, ?, ?)", data
+        )
+        conn.commit()
+    return user_id
+
+
+def measure(fn, repeat):
+    # warm up (connection pool, caches), then time
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    blocks_before = count_blocks(tracemalloc.take_snapshot())
+    before, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = count_blocks(tracemalloc.take_snapshot()) - blocks_before
+    tracemalloc.stop()
+    return result, retained - before, peak - before, blocks, elapsed
+
+
+# live memory blocks (objects, buffers) traced by tracemalloc
+def count_blocks(snapshot):
+    return sum(stat.count for stat in snapshot.statistics("filename"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="jobtracker-rows-")
+    os.chdir(workdir)
+    os.environ.pop("DATABASE_URL", None)
+
+    import app as jobtracker
+    user_id = seed(args.rows)
+
+    def fetch():
+        return jobtracker.get_applications(user_id)
+
+    def dashboard():
+        applications = jobtracker.get_applications(user_id)
+        # a threshold nothing reaches, so the sweep only reads
+        jobtracker.update_no_response(user_id, applications, 10 ** 6)
+        jobtracker.get_chart1_data(applications)
+        jobtracker.get_chart2_data(applications)
+        jobtracker.total_applications(applications)
+        jobtracker.apps_in_process(applications)
+        jobtracker.avg_first_response_time(applications)
+        jobtracker.rejection_percentage(applications)
+        return applications
+
+    with jobtracker.app.app_context():
+        print(f"{args.rows} rows")
+        print(f"{'scenario':<12}{'retained B/row':>16}{'blocks/row':>12}{'peak B/row':>12}{'ms/request':>12}")
+        for name, fn in [("fetch", fetch), ("dashboard", dashboard)]:
+            _, retained, peak, blocks, elapsed = measure(fn, args.repeat)
+            print(f"{name:<12}{retained / args.rows:>16.0f}{blocks / args.rows:>12.1f}"
+                  f"{peak / args.rows:>12.0f}{elapsed * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
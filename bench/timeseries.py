@@ -0,0 +1,57 @@
+"""Time to build the applications-over-time series.
+
+Seeds a throwaway SQLite database with one large account (see rows.py), then times:
+  - user: get_chart2_data() over the account's applications, per granularity
+  - admin: scanning every shard and building the series, as /admin/analytics/timeseries
+
+    python bench/timeseries.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rows import seed  # noqa: E402
+
+
+def timed(fn, repeat):
+    fn()    # warm up (connection pool, date cache)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="jobtracker-timeseries-")
+    os.chdir(workdir)
+    os.environ.pop("DATABASE_URL", None)
+
+    import app as jobtracker
+    from analytics import GRANULARITIES, event_ordinals, iter_all_updates, timeseries
+    user_id = seed(args.rows)
+
+    with jobtracker.app.app_context():
+        applications = jobtracker.get_applications(user_id)
+        print(f"{args.rows} rows")
+        print(f"{'scenario':<16}{'periods':>10}{'ms':>10}")
+        for granularity in GRANULARITIES:
+            series = jobtracker.get_chart2_data(applications, granularity)
+            elapsed = timed(lambda: jobtracker.get_chart2_data(applications, granularity), args.repeat)
+            print(f"{'user ' + granularity:<16}{len(series['labels']):>10}{elapsed:>10.1f}")
+
+        def admin():
+            return timeseries(*event_ordinals(iter_all_updates()), "week")
+        elapsed = timed(admin, args.repeat)
+        print(f"{'admin week':<16}{len(admin()['labels']):>10}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
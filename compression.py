@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import click
+from flask import Flask, current_app, request, send_from_directory, url_for
+
+try:
+    import brotli   # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# smaller responses aren't worth the compression overhead
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/csv", "text/plain", "text/javascript",
+    "application/javascript", "application/json",
+}
+# versioned static URLs (see static_url) never change content, browsers may keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 3600
+# precompressed file extension per encoding, in order of preference
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+# encodings the client accepts, best first
+def accepted_encodings():
+    return [encoding for encoding in PRECOMPRESSED if request.accept_encodings[encoding]]
+
+# after_request hook: compress HTML/JSON/CSV responses with brotli (if installed) or gzip
+def compress_response(response):
+    if (response.direct_passthrough       # files, see send_static_file
+            or response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    encodings = [e for e in accepted_encodings() if e == "gzip" or brotli]
+    if not encodings:
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    if encodings[0] == "br":
+        # low quality levels are fast enough per request and still beat gzip
+        data = brotli.compress(data, quality=5)
+    else:
+        data = gzip.compress(data, compresslevel=6)
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encodings[0]
+    response.vary.add("Accept-Encoding")
+    return response
+
+class PrecompressedFlask(Flask):
+    """Flask app whose static files are served from the .br/.gz copies made by
+    `flask --app app compress-static` when the client accepts them, and cached for
+    a year when requested through a versioned URL (static_url)."""
+
+    def send_static_file(self, filename):
+        max_age = STATIC_MAX_AGE if request.args.get("v") else None
+        path = os.path.join(self.static_folder, filename)
+
+        for encoding in accepted_encodings():
+            compressed = path + PRECOMPRESSED[encoding]
+            # skip copies older than the file, e.g. after editing without re-running compress-static
+            if os.path.isfile(compressed) and os.path.getmtime(compressed) >= os.path.getmtime(path):
+                response = send_from_directory(
+                    self.static_folder, filename + PRECOMPRESSED[encoding],
+                    mimetype=mimetypes.guess_type(filename)[0], max_age=max_age
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(self.static_folder, filename, max_age=max_age)
+
+        response.vary.add("Accept-Encoding")
+        if max_age:
+            response.cache_control.immutable = True
+        return response
+
+_static_versions = {}
+
+# url of a static file with a content hash, so it can be cached for long and still update on deploy
+def static_url(filename):
+    version = _static_versions.get(filename)
+    if version is None:
+        with open(os.path.join(current_app.static_folder, filename), "rb") as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:10]
+        if not current_app.debug:   # files change while developing
+            _static_versions[filename] = version
+    return url_for("static", filename=filename, v=version)
+
+# build step: `flask --app app compress-static` writes .gz (and .br, if brotli is installed) next to static files
+@click.command("compress-static")
+def compress_static_command():
+    for root, _, files in os.walk(current_app.static_folder):
+        for name in files:
+            if name.endswith(tuple(PRECOMPRESSED.values())):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            with open(path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            click.echo(f"Compressed {os.path.relpath(path, current_app.static_folder)}")
+    if not brotli:
+        click.echo("brotli is not installed, wrote gzip copies only.")
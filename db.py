@@ -0,0 +1,491 @@
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+from flask import g, has_request_context, session
+from dotenv import load_dotenv
+
+# the settings below (and DATABASE_URL) may come from .env. loaded here, the first module
+# every entry point (app, CLI, gunicorn hooks) imports, before anything reads the environment
+load_dotenv()
+
+# max open connections per worker process (shared by its threads/greenlets)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+# seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# number of databases applications are spread over, by user (1 = unsharded).
+# shard 0 is the main database, which also holds users and the shard map
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 1))
+# read-only copies of the database for read queries: PostgreSQL URLs, or locally,
+# directories holding copies of the SQLite files. empty = everything uses the primary
+REPLICA_URLS = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+# after writing, a session reads from the primary for this long (covers replication lag)
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+# an unreachable replica is skipped for this long before it is tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+# a signed-in session refreshes its user's last_seen at most this often
+LAST_SEEN_INTERVAL = float(os.getenv("LAST_SEEN_INTERVAL", 3600))
+
+# open a new connection to the configured database (or one of its shards / replicas)
+def connect(shard=0, replica=None):
+    db_url = os.environ.get("DATABASE_URL")
+    if db_url:
+        # running on Render → use PostgreSQL
+        # imported here so SQLite-only processes never pay for the driver import
+        import psycopg2
+        url = replica or db_url
+        if shard:
+            # shard N is schema shard_N in the same database, users stay in public
+            return psycopg2.connect(url, options=f"-c search_path=shard_{shard},public")
+        return psycopg2.connect(url)
+    else:
+        # running locally → use SQLite
+        # pooled connections may be handed to a different thread between requests
+        if replica:
+            # read-only, and fails instead of creating an empty database if the copy is missing
+            path = os.path.abspath(os.path.join(replica, shard_path(shard)))
+            return sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False)
+        return sqlite3.connect(shard_path(shard), check_same_thread=False)
+
+# SQLite file of a shard
+def shard_path(shard):
+    return "databases.db" if not shard else f"databases_shard{shard}.db"
+
+# no free connection in a pool within its timeout
+class PoolTimeout(TimeoutError):
+    pass
+
+class ConnectionPool:
+    """Blocking pool of reusable connections. Waiting callers block on a semaphore,
+    which cooperatively yields when running under gevent workers."""
+
+    def __init__(self, size, timeout, shard=0, replica=None):
+        self.timeout = timeout
+        self.shard = shard
+        self.replica = replica
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    # timeout overrides the pool's wait for a free slot (0 = don't wait)
+    def acquire(self, timeout=None):
+        if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            raise PoolTimeout("timed out waiting for a database connection")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = connect(self.shard, self.replica)
+            except Exception:
+                self._slots.release()
+                raise
+        return conn
+
+    def release(self, conn, discard=False):
+        # psycopg2 exposes 'closed', a dropped connection is not put back
+        if discard or getattr(conn, "closed", False):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+_pools = {}
+_pools_pid = None
+_pool_lock = threading.Lock()
+
+# one pool per shard (and replica) per process: pools inherited through fork (gunicorn --preload) are never reused
+def get_pool(shard=0, replica=None):
+    global _pools, _pools_pid
+    key = (shard, replica)
+    if _pools_pid != os.getpid() or key not in _pools:
+        with _pool_lock:
+            if _pools_pid != os.getpid():
+                _pools = {}
+                _pools_pid = os.getpid()
+            if key not in _pools:
+                _pools[key] = ConnectionPool(POOL_SIZE, POOL_TIMEOUT, shard, replica)
+    return _pools[key]
+
+# borrow a pooled connection: commits on success, rolls back on error, then returns it to the pool.
+# pass user_id for anything touching applications, so it goes to that user's shard
+# (and, for writes, so the user's data version is bumped). writes through get_conn(user_id)
+# leave the commit to it, so the bump lands in the same transaction as the rows it versions.
+# readonly=True lets the query run on a replica, unless this session wrote recently
+@contextmanager
+def get_conn(user_id=None, shard=None, readonly=False):
+    if shard is None:
+        shard = shard_for(user_id) if user_id is not None else 0
+    pool = conn = None
+    if readonly and REPLICA_URLS and not recently_wrote():
+        pool, conn = acquire_replica(shard)
+    if conn is None:
+        # writes, read-after-write, or no replica available
+        pool = get_pool(shard)
+        conn = pool.acquire()
+    discard = False
+    try:
+        yield conn
+        if not readonly and user_id is not None:
+            bump_data_version(conn.cursor(), user_id, shard)
+        conn.commit()
+        if not readonly and user_id is not None:
+            mark_write()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            discard = True  # connection is broken, don't hand it out again
+        raise
+    finally:
+        pool.release(conn, discard)
+
+_replica_turn = itertools.count()
+# replica -> time.monotonic() until which it is skipped
+_replica_down = {}
+
+# connection to the next healthy replica (round robin), or (None, None) if there is none
+def acquire_replica(shard):
+    start = next(_replica_turn)
+    for i in range(len(REPLICA_URLS)):
+        replica = REPLICA_URLS[(start + i) % len(REPLICA_URLS)]
+        if _replica_down.get(replica, 0) > time.monotonic():
+            continue
+        pool = get_pool(shard, replica)
+        try:
+            # a replica whose pool is full is busy, not down: try the next one without waiting
+            conn = pool.acquire(timeout=0)
+        except PoolTimeout:
+            continue
+        except Exception as e:
+            replica_down(replica, e)
+            continue
+        try:
+            # cheap ping, a replica that went away is noticed here instead of mid-request
+            conn.cursor().execute("SELECT 1")
+            return pool, conn
+        except Exception as e:
+            pool.release(conn, discard=True)
+            replica_down(replica, e)
+    return None, None
+
+# skip a replica that can't be connected to or pinged for REPLICA_RETRY_SECONDS
+def replica_down(replica, error):
+    _replica_down[replica] = time.monotonic() + REPLICA_RETRY_SECONDS
+    print(f"Replica {replica} unavailable, using primary: {error}")
+
+# remember that this session changed its data, so its next reads see it
+def mark_write():
+    if REPLICA_URLS and has_request_context():
+        session["wrote_at"] = time.time()
+
+# record that a user is using the app (sign up, login, signed-in requests).
+# purge_inactive goes by it, not by the dates in their applications
+def set_last_seen(cur, user_id):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    now = time.time()
+    cur.execute(f"UPDATE users SET last_seen = {p} WHERE id = {p}", (now, user_id))
+    if has_request_context():
+        session["seen_at"] = now
+
+# did this session record last_seen within LAST_SEEN_INTERVAL
+def seen_recently():
+    return time.time() - session.get("seen_at", 0) < LAST_SEEN_INTERVAL
+
+# did this session write within the stickiness window
+def recently_wrote():
+    if not has_request_context():
+        return False
+    return time.time() - session.get("wrote_at", 0) < REPLICA_STICKY_SECONDS
+
+# version of a user's applications, raised by every write through get_conn(user_id).
+# kept in the same shard (and transaction) as the rows, so a replica never has a newer
+# version than data; caches of derived data (analytics) are keyed by it.
+# None while the shard has no data_versions table yet (init-db not run since upgrading)
+def data_version(cur, user_id, shard):
+    if not has_data_versions(cur, shard):
+        return None
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    cur.execute(f"SELECT version FROM data_versions WHERE user_id = {p}", (user_id,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def bump_data_version(cur, user_id, shard):
+    if not has_data_versions(cur, shard):
+        return
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    cur.execute(
+        f"INSERT INTO data_versions (user_id, version) VALUES ({p}, 1) "
+        "ON CONFLICT (user_id) DO UPDATE SET version = data_versions.version + 1",
+        (user_id,)
+    )
+
+# shards known to have the data_versions table. only found tables are remembered, so
+# running init-db on a live deploy takes effect without a restart
+_versioned_shards = set()
+
+# does the shard have the data_versions table. checked up front instead of catching the
+# error, which on PostgreSQL would abort the caller's transaction
+def has_data_versions(cur, shard):
+    if shard in _versioned_shards:
+        return True
+    if os.environ.get("DATABASE_URL"):
+        # resolved through the connection's search_path, like the queries using it
+        cur.execute("SELECT to_regclass('data_versions')")
+    else:
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'data_versions'")
+    row = cur.fetchone()
+    if row and row[0]:
+        _versioned_shards.add(shard)
+        return True
+    return False
+
+# copy the SQLite files (all shards) into every replica directory, a local stand-in for replication
+def sync_sqlite_replicas():
+    for replica in REPLICA_URLS:
+        os.makedirs(replica, exist_ok=True)
+        for shard in all_shards():
+            src = sqlite3.connect(shard_path(shard))
+            dst = sqlite3.connect(os.path.join(replica, shard_path(shard)))
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+    return REPLICA_URLS
+
+# all shard numbers, for fan-out queries (admin operations, rebalancing)
+def all_shards(count=None):
+    count = SHARD_COUNT if count is None else count
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        # include shards users were moved to that are beyond the configured count
+        cur.execute("SELECT DISTINCT shard FROM shard_map")
+        mapped = {row[0] for row in cur.fetchall()}
+    return sorted(set(range(count)) | mapped)
+
+# shard holding a user's applications
+def shard_for(user_id):
+    if SHARD_COUNT == 1:
+        return 0    # unsharded, skip the lookup
+    if not has_request_context():
+        return mapped_shard(user_id)
+    # looked up once per request (a request opens several connections for the same user)
+    shards = g.setdefault("shards", {})
+    if user_id not in shards:
+        shards[user_id] = mapped_shard(user_id)
+    return shards[user_id]
+
+# shard of a user according to the shard map, or shard 0 for users created before sharding
+def mapped_shard(user_id):
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        cur.execute(f"SELECT shard FROM shard_map WHERE user_id = {p}", (user_id,))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+# place a new user on a shard, using the cursor of the transaction that created them
+def assign_shard(cur, user_id):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    cur.execute(f"INSERT INTO shard_map (user_id, shard) VALUES ({p}, {p})", (user_id, default_shard(user_id)))
+
+# where a user lives when evenly spread over `count` shards
+def default_shard(user_id, count=None):
+    count = SHARD_COUNT if count is None else count
+    return user_id % count
+
+# exception types of constraint violations (e.g. a taken username) on the configured database
+def integrity_errors():
+    if os.environ.get("DATABASE_URL"):
+        import psycopg2
+        return (psycopg2.IntegrityError,)
+    return (sqlite3.IntegrityError,)
+
+# import the database driver ahead of time (e.g. in the gunicorn master before forking),
+# without opening any connection
+def preload_driver():
+    if os.environ.get("DATABASE_URL"):
+        import psycopg2  # noqa: F401
+
+# create tables if they don't exist.
+# migration step: run once per deploy (`flask --app app init-db`), not on import
+def init_db():
+    db_url = os.environ.get("DATABASE_URL")
+
+    if (not db_url):
+        # SQLite
+        with get_conn(shard=0) as conn:
+            cur = conn.cursor()
+            # users table
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL UNIQUE,
+                    password TEXT NOT NULL,
+                    last_seen REAL
+                )
+            """)
+            # last_seen (see set_last_seen) was added later, older databases get the column here
+            cur.execute("PRAGMA table_info(users)")
+            if "last_seen" not in [row[1] for row in cur.fetchall()]:
+                cur.execute("ALTER TABLE users ADD COLUMN last_seen REAL")
+            # users from before it count as seen now, inactivity is measured from the upgrade
+            cur.execute("UPDATE users SET last_seen = ? WHERE last_seen IS NULL", (time.time(),))
+
+            # user -> shard of their applications
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS shard_map (
+                    user_id INTEGER PRIMARY KEY,
+                    shard INTEGER NOT NULL
+                )
+            """)
+
+            # admin maintenance jobs and precomputed admin stats (see maintenance.py)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS maintenance_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    state TEXT,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    error TEXT,
+                    runner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS admin_rollups (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    computed_at REAL NOT NULL
+                )
+            """)
+
+            conn.commit()
+    else:
+        # PostgreSQL
+        with get_conn(shard=0) as conn:
+            cur = conn.cursor()
+            # users table
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    username VARCHAR(20) NOT NULL UNIQUE,
+                    password VARCHAR(20) NOT NULL,
+                    last_seen DOUBLE PRECISION
+                )
+            """)
+            # last_seen (see set_last_seen) was added later, older databases get the column here
+            cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen DOUBLE PRECISION")
+            # users from before it count as seen now, inactivity is measured from the upgrade
+            cur.execute("UPDATE users SET last_seen = %s WHERE last_seen IS NULL", (time.time(),))
+
+            # user -> shard of their applications
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS shard_map (
+                    user_id INTEGER PRIMARY KEY,
+                    shard INTEGER NOT NULL
+                )
+            """)
+
+            # admin maintenance jobs and precomputed admin stats (see maintenance.py)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS maintenance_jobs (
+                    id SERIAL PRIMARY KEY,
+                    kind VARCHAR(30) NOT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    params TEXT,
+                    state TEXT,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    error TEXT,
+                    runner TEXT,
+                    created_at DOUBLE PRECISION NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS admin_rollups (
+                    name VARCHAR(30) PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    computed_at DOUBLE PRECISION NOT NULL
+                )
+            """)
+
+            conn.commit()
+
+    # applications table, in every shard
+    for shard in all_shards():
+        init_shard(shard)
+
+# create the applications and data_versions tables of one shard
+def init_shard(shard):
+    db_url = os.environ.get("DATABASE_URL")
+
+    if (not db_url):
+        # SQLite, shard 0 is databases.db itself
+        with get_conn(shard=shard) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    company TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    updates TEXT,
+                    notes TEXT,
+                    user_id INTEGER,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_applications_user_id ON applications (user_id)")
+            # user -> data version of their applications (see data_version)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+
+            conn.commit()
+    else:
+        # PostgreSQL, shard 0 is the public schema
+        if shard:
+            with get_conn(shard=0) as conn:
+                cur = conn.cursor()
+                cur.execute(f"CREATE SCHEMA IF NOT EXISTS shard_{shard}")
+                conn.commit()
+
+        with get_conn(shard=shard) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS applications (
+                    id SERIAL PRIMARY KEY,
+                    company VARCHAR(30) NOT NULL,
+                    role VARCHAR(30) NOT NULL,
+                    status VARCHAR(30) NOT NULL,
+                    updates TEXT,
+                    notes TEXT,
+                    user_id INTEGER,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_applications_user_id ON applications (user_id)")
+            # user -> data version of their applications (see data_version)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+
+            conn.commit()
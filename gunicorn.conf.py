@@ -0,0 +1,38 @@
+# gunicorn settings, picked up automatically when gunicorn starts from the repo root
+import os
+
+# async serving mode (ASYNC_WORKERS=true, needs `pip install gevent psycogreen`):
+# cooperative gevent workers that keep serving other requests while one waits on
+# Postgres or SMTP, instead of one blocked request per sync worker/thread
+async_workers = os.getenv("ASYNC_WORKERS", "false").lower() == "true"
+if async_workers:
+    # patch the stdlib before the app (and anything it imports) is loaded
+    from gevent import monkey
+    monkey.patch_all()
+    if os.getenv("DATABASE_URL"):
+        # make psycopg2 wait on the gevent hub instead of blocking the worker
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    worker_class = "gevent"
+    # concurrent requests per worker; size DB_POOL_SIZE for the database, not for this
+    worker_connections = int(os.getenv("WORKER_CONNECTIONS", 1000))
+
+# load the app once in the master and fork workers from it.
+# importing app.py is side-effect free (no connections, no DDL), so this is safe
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# run the schema migration once in the master instead of in every worker
+# (.env is loaded first: without preloading, nothing else has read it in the master yet)
+def on_starting(server):
+    from dotenv import load_dotenv
+    load_dotenv()
+    if os.getenv("MIGRATE_ON_START", "false").lower() == "true":
+        from db import init_db
+        init_db()
+
+# with preloading, import the lazily loaded modules before forking so workers share them
+def when_ready(server):
+    if preload_app:
+        from app import warm_up
+        warm_up()
@@ -0,0 +1,484 @@
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+import click
+from db import all_shards, bump_data_version, get_conn
+from models import parse_updates
+
+# rows (or users) handled per step; every step is its own short transaction
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", 500))
+# pause between steps, so live requests get the database in between
+JOB_PAUSE_SECONDS = float(os.getenv("JOB_PAUSE_SECONDS", 0.05))
+# a running job not heard from for this long (e.g. its worker was restarted) can be resumed
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 60))
+# purge_inactive default: users not seen (users.last_seen) for this many days
+INACTIVE_DAYS = 365
+
+# tables of the main database (shard 0) and of every shard, for reindex/vacuum
+MAIN_TABLES = ("users", "shard_map", "maintenance_jobs", "admin_rollups")
+SHARD_TABLES = ("applications", "data_versions")
+
+# statuses a job can be resumed from
+RESUMABLE = ("pending", "paused", "failed")
+
+
+def placeholders(count):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    return ", ".join([p] * count)
+
+# PostgreSQL runs VACUUM and REINDEX CONCURRENTLY only outside a transaction
+@contextmanager
+def autocommit(conn):
+    if not os.environ.get("DATABASE_URL"):
+        yield   # sqlite3 only opens transactions for DML
+        return
+    conn.autocommit = True
+    try:
+        yield
+    finally:
+        conn.autocommit = False
+
+
+# ---------- batches ----------
+
+# next batch of applications (keyset pagination on id) of the job's current shard, moving on to
+# the next shard when one runs out. returns (shard, rows), or (None, []) when all shards are done
+def next_applications(state, columns, readonly=False):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    while state["shard"] < len(state["shards"]):
+        shard = state["shards"][state["shard"]]
+        with get_conn(shard=shard, readonly=readonly) as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT id, {columns} FROM applications WHERE id > {p} ORDER BY id LIMIT {p}",
+                        (state["last_id"], JOB_BATCH_SIZE))
+            rows = cur.fetchall()
+        if rows:
+            state["last_id"] = rows[-1][0]
+            return shard, rows
+        state["shard"] += 1
+        state["last_id"] = 0
+    return None, []
+
+# next batch of users as (user_id, shard), or [] when there are no more
+def next_users(state):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT users.id, COALESCE(shard_map.shard, 0) FROM users LEFT JOIN shard_map ON shard_map.user_id = users.id "
+            f"WHERE users.id > {p} ORDER BY users.id LIMIT {p}",
+            (state["last_id"], JOB_BATCH_SIZE)
+        )
+        users = cur.fetchall()
+    if users:
+        state["last_id"] = users[-1][0]
+    return users
+
+def by_shard(users):
+    shards = {}
+    for user_id, shard in users:
+        shards.setdefault(shard, []).append(user_id)
+    return shards
+
+# delete users with their applications, users given as (user_id, shard)
+def delete_users(users):
+    if not users:
+        return
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    # applications first, a job interrupted in between finds the users again when resumed
+    for shard, user_ids in by_shard(users).items():
+        with get_conn(shard=shard) as conn:
+            cur = conn.cursor()
+            cur.execute(f"DELETE FROM applications WHERE user_id IN ({placeholders(len(user_ids))})", user_ids)
+            cur.execute(f"DELETE FROM data_versions WHERE user_id IN ({placeholders(len(user_ids))})", user_ids)
+            conn.commit()
+
+    user_ids = [user_id for user_id, _ in users]
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM shard_map WHERE user_id IN ({placeholders(len(user_ids))})", user_ids)
+        cur.execute(f"DELETE FROM users WHERE id IN ({placeholders(len(user_ids))})", user_ids)
+        conn.commit()
+
+
+# ---------- job steps ----------
+# each step does one bounded batch, updates the job state in place and returns
+# (items processed, done). steps are safe to repeat, so a job can resume from its last saved state
+
+def step_delete_applications(state, params):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    shard, rows = next_applications(state, "user_id")
+    if shard is None:
+        return 0, True
+    with get_conn(shard=shard) as conn:
+        cur = conn.cursor()
+        # the batch is an id range, new applications get higher ids
+        cur.execute(f"DELETE FROM applications WHERE id >= {p} AND id <= {p}", (rows[0][0], rows[-1][0]))
+        for user_id in {user_id for _, user_id in rows if user_id is not None}:
+            bump_data_version(cur, user_id, shard)  # their cached analytics are stale now
+        conn.commit()
+    return len(rows), False
+
+def step_delete_users(state, params):
+    users = next_users(state)
+    delete_users(users)
+    return len(users), not users
+
+def step_purge_inactive(state, params):
+    users = next_users(state)
+    if not users:
+        return 0, True
+
+    # last_seen is set at sign up, login and while signed in (see db.set_last_seen), unlike the
+    # dates in applications, which are when the user applied. read from the primary, where
+    # a recent visit is already visible; users without last_seen are kept
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    cutoff = time.time() - params.get("days", INACTIVE_DAYS) * 86400
+    user_ids = [user_id for user_id, _ in users]
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT id FROM users WHERE id IN ({placeholders(len(user_ids))}) AND last_seen < {p}", (*user_ids, cutoff))
+        unseen = {row[0] for row in cur.fetchall()}
+
+    inactive = [(user_id, shard) for user_id, shard in users if user_id in unseen]
+    delete_users(inactive)
+    state["purged"] = state.get("purged", 0) + len(inactive)
+    return len(users), False
+
+def step_reindex(state, params):
+    return run_on_table(state, "REINDEX TABLE CONCURRENTLY {table}" if os.environ.get("DATABASE_URL") else "REINDEX {table}")
+
+def step_vacuum(state, params):
+    if os.environ.get("DATABASE_URL"):
+        return run_on_table(state, "VACUUM (ANALYZE) {table}")
+    # SQLite vacuums a whole file (shard) at a time
+    return run_on_table(state, "VACUUM", "ANALYZE")
+
+# one maintenance statement per step, on the next [shard, table] target
+def run_on_table(state, *statements):
+    if state["target"] >= len(state["targets"]):
+        return 0, True
+    shard, table = state["targets"][state["target"]]
+    with get_conn(shard=shard) as conn:
+        with autocommit(conn):
+            cur = conn.cursor()
+            for statement in statements:
+                cur.execute(statement.format(table=table))
+    state["target"] += 1
+    return 1, state["target"] >= len(state["targets"])
+
+def step_rollups(state, params):
+    from analytics import event_ordinals
+    _, rows = next_applications(state, "status, updates", readonly=True)
+    if not rows:
+        save_rollups(state)
+        return 0, True
+
+    statuses = Counter(state["statuses"])
+    statuses.update(status for _, status, _ in rows)
+    state["statuses"] = dict(statuses)
+    # applications per week they were applied in (week number = date ordinal // 7, Sunday start)
+    applied, _ = event_ordinals(parse_updates(updates) for _, _, updates in rows)
+    weeks = Counter(state["weeks"])
+    weeks.update(str(week) for week in (applied // 7).tolist())
+    state["weeks"] = dict(weeks)
+    return len(rows), False
+
+# kind -> (label, step, what the job goes through: applications, users or tables)
+JOB_KINDS = {
+    "rollups": ("Refresh admin stats", step_rollups, "applications"),
+    "delete_applications": ("Delete all applications", step_delete_applications, "applications"),
+    "delete_users": ("Delete all users", step_delete_users, "users"),
+    "purge_inactive": ("Purge inactive users", step_purge_inactive, "users"),
+    "reindex": ("Reindex", step_reindex, "tables"),
+    "vacuum": ("Vacuum / analyze", step_vacuum, "tables"),
+}
+
+
+# ---------- rollups ----------
+
+# store the stats a finished rollups job gathered, plus the user count
+def save_rollups(state):
+    from analytics import MAX_PERIODS
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM users")
+        users = cur.fetchone()[0]
+
+    # applications added per week and running total, empty weeks included
+    weeks = {int(week): count for week, count in state["weeks"].items()}
+    growth = {"labels": [], "starts": [], "added": [], "total": []}
+    total = 0
+    if weeks:
+        last = max(weeks)
+        for week in range(min(weeks), last + 1):
+            total += weeks.get(week, 0)
+            if week > last - MAX_PERIODS:
+                start = date.fromordinal(week * 7)
+                growth["labels"].append(start.strftime("%d/%m/%Y"))
+                growth["starts"].append(start.isoformat())
+                growth["added"].append(weeks.get(week, 0))
+                growth["total"].append(total)
+
+    rollups = {
+        "users": users,
+        "applications": sum(state["statuses"].values()),
+        "statuses": dict(sorted(state["statuses"].items(), key=lambda item: -item[1])),
+        "growth": growth,
+    }
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        for name, data in rollups.items():
+            cur.execute(
+                f"INSERT INTO admin_rollups (name, data, computed_at) VALUES ({p}, {p}, {p}) "
+                "ON CONFLICT (name) DO UPDATE SET data = excluded.data, computed_at = excluded.computed_at",
+                (name, json.dumps(data), time.time())
+            )
+        conn.commit()
+
+# stored rollups: {name: data, ..., "computed_at": timestamp or None}
+def load_rollups():
+    with get_conn(shard=0, readonly=True) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT name, data, computed_at FROM admin_rollups")
+        rows = cur.fetchall()
+    rollups = {name: json.loads(data) for name, data, _ in rows}
+    rollups["computed_at"] = format_time(min(row[2] for row in rows)) if rows else None
+    return rollups
+
+
+# ---------- jobs ----------
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y %H:%M:%S") if timestamp else None
+
+# create a job (status pending) and return its id; run it with run_job
+def create_job(kind, **params):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job: {kind}")
+    shards = all_shards()
+    scope = JOB_KINDS[kind][2]
+
+    if scope == "applications":
+        state = {"shards": shards, "shard": 0, "last_id": 0}
+        if kind == "rollups":
+            state.update(statuses={}, weeks={})
+        total = 0
+        for shard in shards:
+            with get_conn(shard=shard, readonly=True) as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT COUNT(*) FROM applications")
+                total += cur.fetchone()[0]
+    elif scope == "users":
+        state = {"last_id": 0}
+        with get_conn(shard=0) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM users")
+            total = cur.fetchone()[0]
+    else:
+        if kind == "vacuum" and not os.environ.get("DATABASE_URL"):
+            targets = [[shard, None] for shard in shards]
+        else:
+            targets = [[0, table] for table in MAIN_TABLES] + [[shard, table] for shard in shards for table in SHARD_TABLES]
+        state = {"targets": targets, "target": 0}
+        total = len(targets)
+
+    now = time.time()
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        query = ("INSERT INTO maintenance_jobs (kind, status, params, state, processed, total, created_at, updated_at) "
+                 f"VALUES ({p}, 'pending', {p}, {p}, 0, {p}, {p}, {p})")
+        values = (kind, json.dumps(params), json.dumps(state), total, now, now)
+        if p == "%s":
+            cur.execute(query + " RETURNING id", values)
+            job_id = cur.fetchone()[0]
+        else:
+            cur.execute(query, values)
+            job_id = cur.lastrowid
+        conn.commit()
+    return job_id
+
+JOB_COLUMNS = "id, kind, status, params, state, processed, total, error, created_at, updated_at"
+
+def job_from_row(row):
+    job = dict(zip(JOB_COLUMNS.split(", "), row))
+    job["params"] = json.loads(job["params"] or "{}")
+    job["state"] = json.loads(job["state"] or "{}")
+    return job
+
+def load_job(job_id):
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        cur.execute(f"SELECT {JOB_COLUMNS} FROM maintenance_jobs WHERE id = {p}", (job_id,))
+        row = cur.fetchone()
+    return job_from_row(row) if row else None
+
+# most recent jobs, newest first
+def recent_jobs(limit=20):
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        cur.execute(f"SELECT {JOB_COLUMNS} FROM maintenance_jobs ORDER BY id DESC LIMIT {p}", (limit,))
+        return [job_from_row(row) for row in cur.fetchall()]
+
+# what the admin page and /admin/jobs show of a job
+def job_summary(job):
+    stale = job["status"] == "running" and job["updated_at"] < time.time() - JOB_STALE_SECONDS
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "label": JOB_KINDS[job["kind"]][0] if job["kind"] in JOB_KINDS else job["kind"],
+        "status": "stalled" if stale else job["status"],
+        "processed": job["processed"],
+        "total": job["total"],
+        "percent": 100 if job["status"] == "done" else min(100, round(job["processed"] / job["total"] * 100)) if job["total"] else 0,
+        "purged": job["state"].get("purged"),
+        "error": job["error"],
+        "created_at": format_time(job["created_at"]),
+        "updated_at": format_time(job["updated_at"]),
+        "resumable": job["status"] in RESUMABLE or stale,
+    }
+
+# take a job over for running: only one runner at a time. a new job is only taken while still
+# pending (not when paused before it got its turn); resume also takes paused, failed and
+# stalled jobs. returns the runner token that later saves must present, or None
+def claim_job(job_id, resume=False):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    now = time.time()
+    runner = uuid.uuid4().hex
+    statuses = RESUMABLE if resume else ("pending",)
+    condition = f"status IN ({placeholders(len(statuses))})"
+    params = [runner, now, job_id, *statuses]
+    if resume:
+        condition = f"({condition} OR (status = 'running' AND updated_at < {p}))"
+        params.append(now - JOB_STALE_SECONDS)
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"UPDATE maintenance_jobs SET status = 'running', runner = {p}, error = NULL, updated_at = {p} "
+            f"WHERE id = {p} AND {condition}",
+            params
+        )
+        claimed = cur.rowcount == 1
+        conn.commit()
+    return runner if claimed else None
+
+# save progress; False means stop (paused meanwhile, or taken over by another runner).
+# a finished batch is still saved when paused, so resuming doesn't redo it
+def save_job(job, status, runner):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    values = (json.dumps(job["state"]), job["processed"], time.time(), job["id"], runner)
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"UPDATE maintenance_jobs SET status = {p}, state = {p}, processed = {p}, updated_at = {p} "
+            f"WHERE id = {p} AND runner = {p} AND status = 'running'",
+            (status, *values)
+        )
+        saved = cur.rowcount == 1
+        if not saved:
+            cur.execute(
+                f"UPDATE maintenance_jobs SET state = {p}, processed = {p}, updated_at = {p} "
+                f"WHERE id = {p} AND runner = {p} AND status = 'paused'",
+                values
+            )
+        conn.commit()
+    return saved
+
+# ask a running job to stop after its current step
+def pause_job(job_id):
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(f"UPDATE maintenance_jobs SET status = 'paused', updated_at = {p} WHERE id = {p} AND status IN ('pending', 'running')",
+                    (time.time(), job_id))
+        conn.commit()
+
+def run_job(job_id, on_progress=None, resume=False):
+    """Run a job step by step from its saved state, pausing JOB_PAUSE_SECONDS between steps.
+    Without resume only a pending job runs, with resume a paused, failed or stalled one too.
+    Returns the final job summary, or None if the job can't be claimed (e.g. running or done).
+    Stops early when the job is paused; a failed step marks the job failed, both can be resumed."""
+    runner = claim_job(job_id, resume)
+    if runner is None:
+        return None
+    job = load_job(job_id)
+    step = JOB_KINDS[job["kind"]][1]
+    status = "running"
+    try:
+        while status == "running":
+            processed, done = step(job["state"], job["params"])
+            job["processed"] += processed
+            status = "done" if done else "running"
+            if not save_job(job, status, runner):
+                break   # paused
+            job["status"] = status
+            if on_progress:
+                on_progress(job_summary(job))
+            if not done:
+                time.sleep(JOB_PAUSE_SECONDS)
+    except Exception as e:
+        p = "%s" if os.environ.get("DATABASE_URL") else "?"
+        with get_conn(shard=0) as conn:
+            cur = conn.cursor()
+            cur.execute(f"UPDATE maintenance_jobs SET status = 'failed', error = {p}, updated_at = {p} WHERE id = {p} AND runner = {p}",
+                        (str(e), time.time(), job_id, runner))
+            conn.commit()
+        print(f"Maintenance job {job_id} ({job['kind']}) failed: {e}")
+    return job_summary(load_job(job_id))
+
+
+# `flask --app app maintenance ...`
+@click.group("maintenance")
+def maintenance_cli():
+    """Run admin maintenance jobs in bounded batches."""
+
+# run a job in the foreground; Ctrl+C pauses it so it can be resumed
+def run_here(job_id, resume=False):
+    try:
+        return run_job(job_id, echo_progress, resume)
+    except KeyboardInterrupt:
+        pause_job(job_id)
+        click.echo(f"Paused job {job_id}, continue with: flask --app app maintenance resume {job_id}")
+        return False
+
+def echo_progress(summary):
+    purged = f", {summary['purged']} purged" if summary["purged"] is not None else ""
+    click.echo(f"job {summary['id']} {summary['kind']}: {summary['processed']}/{summary['total']} "
+               f"({summary['percent']}%{purged}) {summary['status']}")
+
+@maintenance_cli.command("start")
+@click.argument("kind", type=click.Choice(list(JOB_KINDS)))
+@click.option("--days", type=int, default=INACTIVE_DAYS, show_default=True,
+              help="purge_inactive: users not seen (signed in or used the app) for this many days.")
+def start_command(kind, days):
+    """Create a KIND job and run it here, printing progress (Ctrl+C pauses it)."""
+    job_id = create_job(kind, **({"days": days} if kind == "purge_inactive" else {}))
+    click.echo(f"Created job {job_id}")
+    run_here(job_id)
+
+@maintenance_cli.command("resume")
+@click.argument("job_id", type=int)
+def resume_command(job_id):
+    """Continue a paused, failed or stalled job from where it stopped."""
+    if run_here(job_id, resume=True) is None:
+        raise click.ClickException(f"Job {job_id} is running elsewhere, done, or doesn't exist.")
+
+@maintenance_cli.command("pause")
+@click.argument("job_id", type=int)
+def pause_command(job_id):
+    """Stop a running job after its current batch."""
+    pause_job(job_id)
+
+@maintenance_cli.command("status")
+def status_command():
+    """Show recent jobs."""
+    for job in recent_jobs():
+        echo_progress(job_summary(job))
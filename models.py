@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+
+DATE_FORMAT = "%d/%m/%Y"
+# accepted formats for dates typed in by users
+DATE_INPUT_FORMATS = (
+    "%d-%m-%Y", "%Y-%m-%d",
+    "%d/%m/%Y", "%Y/%m/%d",
+    "%d.%m.%Y", "%Y.%m.%d",
+    "%d %m %Y", "%Y %m %d",
+    "%d%m%Y", "%Y%m%d"
+)
+
+# parse a date string in any of DATE_INPUT_FORMATS, None if it matches none
+def try_parse_date(date_str):
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except (ValueError, TypeError):
+            continue
+    return None
+
+# parse dates
+def parse_date(date_str, as_datetime=True):
+    """Parse a date string in various formats.
+    Returns datetime by default, or formatted string if as_datetime=False."""
+    dt = try_parse_date(date_str)
+    if dt is None:
+        # fallback to today's date
+        dt = datetime.now()
+    return dt if as_datetime else dt.strftime(DATE_FORMAT)
+
+# convert any updates input into a list
+def parse_updates(input):
+    if not input:
+        return []
+    if isinstance(input, list):
+        return input  # already parsed
+    if isinstance(input, str):
+        try:
+            return json.loads(input)
+        except json.JSONDecodeError:
+            pass
+    return []
+
+class ApplicationRecord:
+    """One row of the applications table.
+
+    Uses __slots__ instead of a per-row dict. `updates` is kept as the raw JSON text
+    from the database and decoded once, on first access. Supports both attribute
+    access (Jinja templates) and item access (app["status"], app.get("notes")).
+    For json.dumps use to_dict, e.g. json.dumps(apps, default=ApplicationRecord.to_dict)."""
+
+    FIELDS = ("id", "company", "role", "status", "updates", "notes")
+    __slots__ = ("id", "company", "role", "status", "notes", "_updates_raw", "_updates")
+
+    def __init__(self, id, company, role, status, updates, notes):
+        self.id = id
+        self.company = company
+        self.role = role
+        self.status = status
+        self.notes = notes
+        self._updates_raw = updates
+        self._updates = None    # not decoded yet
+
+    @property
+    def updates(self):
+        if self._updates is None:
+            self._updates = parse_updates(self._updates_raw)
+            self._updates_raw = None    # the decoded list replaces the text
+        return self._updates
+
+    @updates.setter
+    def updates(self, value):
+        self._updates = parse_updates(value)
+        self._updates_raw = None
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def get(self, key, default=None):
+        return self[key] if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"ApplicationRecord(id={self.id!r}, company={self.company!r}, role={self.role!r}, status={self.status!r})"
@@ -0,0 +1,126 @@
+import os
+import click
+from db import SHARD_COUNT, all_shards, data_version, default_shard, get_conn, init_shard, mapped_shard
+
+# moves must stay below SHARD_COUNT: with the default of 1 the app never reads the shard
+# map, so rows moved to another shard would disappear for their user
+def check_shard_count(count):
+    if count > SHARD_COUNT:
+        raise ValueError(f"SHARD_COUNT is {SHARD_COUNT}, raise it (for the app and this command) "
+                         f"to at least {count} before moving users there.")
+
+# move one user's applications to another shard and point the shard map at it.
+# maintenance tool: changes the user makes while their rows are being copied are lost
+def move_user(user_id, target):
+    check_shard_count(target + 1)
+    source = mapped_shard(user_id)
+    p = "%s" if os.environ.get("DATABASE_URL") else "?"
+
+    rows = []
+    if source != target:
+        init_shard(target)
+
+        with get_conn(shard=source) as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT company, role, status, updates, notes FROM applications WHERE user_id = {p} ORDER BY id",
+                        (user_id,))
+            rows = cur.fetchall()
+            version = data_version(cur, user_id, source) or 0
+
+        with get_conn(shard=target) as conn:
+            cur = conn.cursor()
+            # leftovers of an interrupted move (the map still points at the source)
+            cur.execute(f"DELETE FROM applications WHERE user_id = {p}", (user_id,))
+            # rows get new IDs in the target shard
+            cur.executemany(
+                f"INSERT INTO applications (company, role, status, updates, notes, user_id) VALUES ({p}, {p}, {p}, {p}, {p}, {p})",
+                [(*row, user_id) for row in rows]
+            )
+            # the data version keeps increasing across moves, caches keyed by it never see an old one again
+            version = max(version, data_version(cur, user_id, target)) + 1
+            cur.execute(f"DELETE FROM data_versions WHERE user_id = {p}", (user_id,))
+            cur.execute(f"INSERT INTO data_versions (user_id, version) VALUES ({p}, {p})", (user_id, version))
+            conn.commit()
+
+    # switch the user over (also records users created before sharding)
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM shard_map WHERE user_id = {p}", (user_id,))
+        cur.execute(f"INSERT INTO shard_map (user_id, shard) VALUES ({p}, {p})", (user_id, target))
+        conn.commit()
+
+    if source != target:
+        with get_conn(shard=source) as conn:
+            cur = conn.cursor()
+            cur.execute(f"DELETE FROM applications WHERE user_id = {p}", (user_id,))
+            cur.execute(f"DELETE FROM data_versions WHERE user_id = {p}", (user_id,))
+            conn.commit()
+
+    return len(rows)
+
+# spread all users evenly over `count` shards, yields (user_id, source, target, rows moved)
+def rebalance(count=None):
+    count = SHARD_COUNT if count is None else count
+    check_shard_count(count)
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT users.id, shard_map.shard FROM users LEFT JOIN shard_map ON shard_map.user_id = users.id ORDER BY users.id")
+        users = cur.fetchall()
+
+    for user_id, shard in users:
+        target = default_shard(user_id, count)
+        if shard != target:
+            # users without a map row live in shard 0
+            yield user_id, shard or 0, target, move_user(user_id, target)
+
+# users and applications per shard
+def shard_stats():
+    stats = {}
+    with get_conn(shard=0) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(shard_map.shard, 0), COUNT(*) FROM users LEFT JOIN shard_map ON shard_map.user_id = users.id GROUP BY 1")
+        users = dict(cur.fetchall())
+
+    for shard in all_shards():
+        with get_conn(shard=shard) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM applications")
+            stats[shard] = (users.get(shard, 0), cur.fetchone()[0])
+    return stats
+
+
+# `flask --app app shards ...`
+@click.group("shards")
+def shards_cli():
+    """Inspect and rebalance the user -> shard map."""
+
+@shards_cli.command("status")
+def status_command():
+    """Show users and applications per shard."""
+    click.echo(f"SHARD_COUNT={SHARD_COUNT}")
+    for shard, (users, apps) in shard_stats().items():
+        click.echo(f"shard {shard}: {users} users, {apps} applications")
+
+@shards_cli.command("move")
+@click.argument("user_id", type=int)
+@click.argument("shard", type=int)
+def move_command(user_id, shard):
+    """Move one user to SHARD."""
+    try:
+        moved = move_user(user_id, shard)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"user {user_id} -> shard {shard} ({moved} applications copied)")
+
+@shards_cli.command("rebalance")
+@click.option("--count", type=int, default=None, help="Number of shards to spread users over (default: SHARD_COUNT).")
+def rebalance_command(count):
+    """Move every user to their default shard for --count shards.
+    Run it with the new count before lowering SHARD_COUNT."""
+    try:
+        check_shard_count(count or SHARD_COUNT)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for user_id, source, target, moved in rebalance(count):
+        click.echo(f"user {user_id}: shard {source} -> {target} ({moved} applications)")
+    click.echo("Done.")
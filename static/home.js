@@ -0,0 +1,444 @@
+// Job Tracker dashboard script (loaded with defer, so the page is parsed when it runs).
+// Page data comes from the JSON payload in #dashboard_data instead of inline scripts.
+const dashboardData = JSON.parse(document.getElementById('dashboard_data').textContent);
+
+// ---------- Applications table ----------
+// Rows come from the JSON payload and are built once here; all buttons are handled by
+// delegated listeners on the table and on the single shared updates modal.
+
+const STATUSES = [
+    'Applied', 'OA1', 'OA2', 'OA3', 'Interview1', 'Interview2', 'Interview3', 'HR Interview',
+    'Technical Interview', 'Online Interview', 'Frontal Interview', 'Final Interview',
+    'Offer', 'Rejected', 'No Response'
+];
+
+// payload row layout: [id, company, role, status, notes, [[status, date], ...]]
+const applicationsById = new Map();
+
+function el(tag, props = {}, children = []) {
+    const { dataset, ...rest } = props;
+    const node = document.createElement(tag);
+    Object.assign(node, rest);
+    Object.assign(node.dataset, dataset);
+    for (const child of children) {
+        node.append(child);
+    }
+    return node;
+}
+
+function statusSelect(selected) {
+    return el('select', { name: 'status' },
+        STATUSES.map(status => el('option', { value: status, textContent: status, selected: status === selected })));
+}
+
+function postForm(action, children, props = {}) {
+    return el('form', { action: action, method: 'post', ...props }, children);
+}
+
+// DD/MM/YYYY -> YYYY-MM-DD for input type=date
+function formatDateForInput(dateStr) {
+    const parts = (dateStr || '').split('/');
+    if (parts.length !== 3) {
+        return '';
+    }
+    const [day, month, year] = parts;
+    return `${year}-${month.padStart(2, '0')}-${day.padStart(2, '0')}`;
+}
+
+function todayForInput() {
+    const today = new Date();
+    const yyyy = today.getFullYear();
+    const mm = String(today.getMonth() + 1).padStart(2, '0');
+    const dd = String(today.getDate()).padStart(2, '0');
+    return `${yyyy}-${mm}-${dd}`;
+}
+
+function applicationRow([id, company, role, status, notes, updates]) {
+    const urls = dashboardData.urls;
+    return el('tr', {}, [
+        el('td', { textContent: company }),
+        el('td', { textContent: role }),
+        // Update status of existing application
+        el('td', {}, [
+            postForm(urls.update_status + id, [statusSelect(status), el('button', { type: 'submit', textContent: 'Update' })])
+        ]),
+        el('td', {}, [
+            // Show current updates
+            el('div', {}, updates.map(([updStatus, updDate]) => el('div', { textContent: `${updStatus} - ${updDate}` }))),
+            // Button to open the updates editor
+            el('button', { type: 'button', textContent: 'Manage Updates', dataset: { action: 'open-updates', id: id } })
+        ]),
+        // Update notes of existing application
+        el('td', {}, [
+            postForm(urls.update_notes + id, [
+                el('textarea', { name: 'notes', rows: 4, value: notes }),
+                el('button', { type: 'submit', textContent: 'Save' })
+            ])
+        ]),
+        el('td', {}, [
+            // Delete button to remove application (confirmed by the delegated submit listener)
+            postForm(urls.delete_application + id, [el('button', { type: 'submit', textContent: 'Delete' })],
+                { className: 'delete_form', style: 'display:inline;' }),
+            el('br'),
+            el('br'),
+            // Duplicate button to copy application
+            postForm(urls.duplicate_application + id, [el('button', { type: 'submit', textContent: 'Duplicate' })],
+                { style: 'display:inline;' })
+        ])
+    ]);
+}
+
+function renderApplications() {
+    const body = document.getElementById('applicationsBody');
+    const fragment = document.createDocumentFragment();
+    for (const row of dashboardData.rows) {
+        applicationsById.set(row[0], row);
+        fragment.append(applicationRow(row));
+    }
+    body.append(fragment);
+}
+
+// ---------- Updates editor (one modal shared by all rows) ----------
+const updatesModal = document.getElementById('updates_modal');
+const updatesForm = document.getElementById('updates_form');
+const updatesList = updatesForm.querySelector('.updates_list');
+
+function updateRow(status, date) {
+    return el('div', { className: 'update_row' }, [
+        statusSelect(status),
+        el('input', { type: 'date', name: 'date', value: date }),
+        el('button', { type: 'button', textContent: 'Delete', dataset: { action: 'delete-update' } })
+    ]);
+}
+
+function open_updates_modal(app_id) {
+    const updates = applicationsById.get(app_id)[5];
+    updatesForm.action = dashboardData.urls.update_updates + app_id;
+    updatesList.replaceChildren(...updates.map(([status, date]) => updateRow(status, formatDateForInput(date))));
+    updatesModal.style.display = 'flex';
+}
+
+function close_updates_modal() {
+    updatesModal.style.display = 'none';
+}
+
+document.getElementById('applicationsTable').addEventListener('click', e => {
+    const button = e.target.closest('[data-action="open-updates"]');
+    if (button) {
+        open_updates_modal(Number(button.dataset.id));
+    }
+});
+
+document.getElementById('applicationsTable').addEventListener('submit', e => {
+    // Confirm before deleting
+    if (e.target.classList.contains('delete_form') &&
+        !confirm('Are you sure you want to delete this application?')) {
+        e.preventDefault();
+    }
+});
+
+updatesModal.addEventListener('click', e => {
+    const action = e.target.dataset.action;
+    if (action === 'add-update') {
+        updatesList.append(updateRow('Applied', todayForInput()));
+    } else if (action === 'delete-update') {
+        e.target.parentElement.remove();
+    } else if (action === 'close-updates') {
+        close_updates_modal();
+    }
+});
+
+renderApplications();
+
+
+// ---------- Settings ----------
+const autoNoResponseCheckbox = document.getElementById('autoNoResponse');
+const noResponseDaysInput = document.getElementById('noResponseDays');
+const inactiveBottomCheckbox = document.getElementById('inactiveBottom');
+const dimInactiveCheckbox = document.getElementById('dimInactive');
+const emailNoResponseCheckbox = document.getElementById('emailNoResponse');
+const emailAddressInput = document.getElementById('emailAddress');
+
+// Toggle disabled state of days input
+function toggleNoReponseDaysInput() {
+    noResponseDaysInput.disabled = !autoNoResponseCheckbox.checked;
+}
+
+function syncSettingsToCookies() {
+    document.cookie = "autoNoResponse=" + localStorage.getItem('autoNoResponse') + "; path=/";
+    document.cookie = "noResponseDays=" + localStorage.getItem('noResponseDays') + "; path=/";
+    document.cookie = "inactiveBottom=" + localStorage.getItem('inactiveBottom') + "; path=/";
+    document.cookie = "grayInactive=" + localStorage.getItem('dimInactive') + "; path=/";
+    document.cookie = "emailNoResponse=" + localStorage.getItem('emailNoResponse') + "; path=/";
+    document.cookie = "emailAddress=" + localStorage.getItem('emailAddress') + "; path=/";
+}
+
+// Load saved settings
+window.addEventListener('DOMContentLoaded', () => {
+    // Auto No Response
+    const autoNoResponse = localStorage.getItem('autoNoResponse') === 'true';
+    autoNoResponseCheckbox.checked = autoNoResponse;
+
+    const noResponseDays = localStorage.getItem('noResponseDays');
+    if (noResponseDays) {
+        noResponseDaysInput.value = noResponseDays;
+    }
+
+    // Set disabled state of days input
+    toggleNoReponseDaysInput();
+
+    // Inactive at bottom
+    const inactiveBottom = localStorage.getItem('inactiveBottom') === 'true';
+    inactiveBottomCheckbox.checked = inactiveBottom;
+
+    // Dim inactive
+    const dimInactive = localStorage.getItem('dimInactive') === 'true';
+    dimInactiveCheckbox.checked = dimInactive;
+    applyDimInactive();
+
+    // Email on auto No Response
+    const emailNoResponse = localStorage.getItem('emailNoResponse') === 'true';
+    emailNoResponseCheckbox.checked = emailNoResponse;
+    emailAddressInput.value = localStorage.getItem('emailAddress') || '';
+
+    // Set disabled state of email input
+    toggleEmailForm();
+
+    // Sync to cookies right away
+    syncSettingsToCookies();
+});
+
+// Save when changed + sync to cookies
+autoNoResponseCheckbox.addEventListener('change', e => {
+    localStorage.setItem('autoNoResponse', e.target.checked);
+    toggleNoReponseDaysInput();
+    syncSettingsToCookies();
+    // location.reload();  // Reload page to apply
+});
+
+noResponseDaysInput.addEventListener('input', e => {
+    localStorage.setItem('noResponseDays', e.target.value);
+    syncSettingsToCookies();
+});
+
+inactiveBottomCheckbox.addEventListener('change', e => {
+    localStorage.setItem('inactiveBottom', e.target.checked);
+    syncSettingsToCookies();
+    location.reload();  // Reload page to apply
+});
+
+dimInactiveCheckbox.addEventListener('change', e => {
+    localStorage.setItem('dimInactive', e.target.checked);
+    syncSettingsToCookies();
+    location.reload();  // Reload page to apply
+});
+
+function applyDimInactive() {
+    const rows = document.querySelectorAll('#applicationsTable tr');
+    rows.forEach(row => {
+        const select = row.querySelector("td:nth-child(3) select");
+        if (select) {
+            const status = select.value;
+            if (status === 'Rejected' || status === 'No Response') {
+                row.style.opacity = dimInactiveCheckbox.checked ? '0.2' : '1';
+            } else {
+                row.style.opacity = '1'; // reset others
+            }
+        }
+    });
+}
+
+// checkbox for email updates
+emailNoResponseCheckbox.addEventListener('change', e => {
+    localStorage.setItem('emailNoResponse', e.target.checked);
+    toggleEmailForm();
+    syncSettingsToCookies();
+});
+
+// Toggle disabled state of email input
+function toggleEmailForm() {
+    emailAddressInput.disabled = !emailNoResponseCheckbox.checked;
+    document.getElementById('emailFormSubmit').disabled = emailAddressInput.disabled;
+}
+
+// email updates form submission
+document.getElementById('emailForm').addEventListener('submit', e => {
+    e.preventDefault();  // prevent page reload
+    localStorage.setItem('emailAddress', emailAddressInput.value);
+    syncSettingsToCookies();
+    alert('Email address saved!');
+
+    alert("Automatic email updates are disabled on Render :(");
+});
+
+// ---------- Insights ----------
+// Toggle insights button
+function toggleInsights() {
+    const insights = document.getElementById('insights');
+    const btn = document.getElementById('toggleInsightsBtn');
+
+    if (insights.style.visibility === 'hidden') {    // hidden -> shown
+        insights.style.visibility = 'visible';
+        btn.textContent = 'Hide Insights';
+        localStorage.setItem('insightsVisible', 'true');    // save state for page reload
+    }
+    else {  // shown -> hidden
+        insights.style.visibility = 'hidden';
+        btn.textContent = 'Show Insights';
+        localStorage.setItem('insightsVisible', 'false');
+    }
+};
+
+// On page load, set insights visibility based on localStorage
+window.addEventListener('DOMContentLoaded', () => {
+    const insights = document.getElementById('insights');
+    const btn = document.getElementById('toggleInsightsBtn');
+
+    if (localStorage.getItem('insightsVisible') === 'false') {
+        insights.style.display = 'none';
+        btn.textContent = 'Show Insights';
+    } else {
+        insights.style.display = 'flex';
+        btn.textContent = 'Hide Insights';
+    }
+});
+
+// Pie Chart Script – Applications by Status
+const ctxPie = document.getElementById('statusPieChart').getContext('2d');
+const statusData = dashboardData.statusData;
+
+new Chart(ctxPie, {
+    type: 'pie',
+    data: {
+        labels: Object.keys(statusData),    // ["Applied", "Interview", ...]
+        datasets: [{
+            data: Object.values(statusData),    // Number of applications per status
+        }]
+    },
+    options: {
+        // Show numbers on pie chart (without hover)
+        plugins: {
+            datalabels: {
+                color: '#fff',
+                font: {
+                    weight: 'bold',
+                    size: 14
+                },
+                formatter: (value) => value
+            }
+        }
+    },
+    plugins: [ChartDataLabels]
+});
+
+// Bar Chart Script – Applications (and responses) Over Time
+const ctxBar = document.getElementById('applicationsOverTimeChart').getContext('2d');
+let timeSeries = dashboardData.timeSeries;
+
+const barChart = new Chart(ctxBar, {
+    type: 'bar',
+    data: timeSeriesChartData(timeSeries),
+    options: {
+        responsive: true,
+        scales: {
+            y: {
+                beginAtZero: true,
+                ticks: {
+                    stepSize: 1
+                }
+            }
+        },
+        plugins: {
+            // Show period range on hover
+            // 'Applications: value (start_date → end_date)'
+            tooltip: {
+                callbacks: {
+                    label: function (context) {
+                        return `${context.dataset.label}: ${context.raw} (${timeSeries.ranges[context.dataIndex]})`;
+                    }
+                }
+            },
+            // Show numbers on bars, empty periods stay blank
+            datalabels: {
+                color: '#fff',
+                font: {
+                    weight: 'bold',
+                    size: 12
+                },
+                formatter: (value) => value || ''
+            }
+        },
+    },
+    plugins: [ChartDataLabels]
+});
+
+function timeSeriesChartData(series) {
+    return {
+        labels: series.labels,      // first day of each period
+        datasets: [
+            { label: 'Applications', data: series.applied, backgroundColor: '#4e79a7' },   // blue
+            { label: 'Responses', data: series.responses, backgroundColor: '#59a14f' },    // green
+        ]
+    };
+}
+
+// Granularity and date range: fetch the series for the same table filters and redraw
+const granularitySelect = document.getElementById('granularity');
+const rangeStartInput = document.getElementById('rangeStart');
+const rangeEndInput = document.getElementById('rangeEnd');
+
+async function reloadTimeSeries() {
+    const params = new URLSearchParams(location.search);
+    params.set('granularity', granularitySelect.value);
+    params.set('start', rangeStartInput.value);
+    params.set('end', rangeEndInput.value);
+
+    const response = await fetch(`${dashboardData.urls.timeseries}?${params}`);
+    const data = await response.json();
+    if (!response.ok) {
+        alert(data.error);
+        return;
+    }
+    timeSeries = data;
+    barChart.data = timeSeriesChartData(timeSeries);
+    barChart.update();
+}
+
+[granularitySelect, rangeStartInput, rangeEndInput].forEach(input => {
+    input.addEventListener('change', reloadTimeSeries);
+});
+
+// Funnel panel – stage conversion, time in stage and response times, computed (and cached) on the server
+async function loadFunnel() {
+    const panel = document.getElementById('funnelPanel');
+    const response = await fetch(dashboardData.urls.funnel);
+    if (!response.ok) {
+        panel.textContent = 'Not available';
+        return;
+    }
+    const funnel = await response.json();
+    const days = value => value === null || value === undefined ? '-' : `${value} days`;
+    const list = items => el('ul', { className: 'funnel_list' }, items.map(text => el('li', { textContent: text })));
+    const responseDays = funnel.responseDays;
+
+    panel.replaceChildren(
+        el('strong', { textContent: 'Conversion' }),
+        list(funnel.funnel.map((step, i) =>
+            i === 0 ? `${step.stage}: ${step.count}` : `${step.stage}: ${step.count} (${step.rate ?? 0}%, ${step.overall ?? 0}% overall)`)),
+        el('strong', { textContent: 'Median time in stage' }),
+        list(Object.entries(funnel.stageDays).map(([stage, stay]) => `${stage}: ${days(stay.median)}`)),
+        el('strong', { textContent: 'Response time (p50 / p90)' }),
+        list([`All: ${days(responseDays.p50)} / ${days(responseDays.p90)} (${responseDays.count})`]),
+        el('table', { className: 'funnel_companies' }, [
+            el('tr', {}, ['Company', 'Responses', 'p50', 'p90'].map(title => el('th', { textContent: title }))),
+            ...funnel.companies.map(company => el('tr', {}, [
+                el('td', { textContent: company.company }),
+                el('td', { textContent: company.count }),
+                el('td', { textContent: days(company.p50) }),
+                el('td', { textContent: days(company.p90) }),
+            ])),
+        ]),
+    );
+}
+
+loadFunnel();
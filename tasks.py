@@ -0,0 +1,51 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+# number of background threads (greenlets under gevent workers) per process
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 4))
+# threads per process for maintenance jobs, apart from the background tasks above so a long
+# job never holds up request follow-up work (e.g. the 'No Response' sweep). more jobs queue up
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+# set to false to run background work inline, inside the request
+BACKGROUND_TASKS = os.getenv("BACKGROUND_TASKS", "true").lower() == "true"
+
+_executors = {}
+_executors_pid = None
+_executor_lock = threading.Lock()
+
+# one executor per name per process, threads don't survive a fork
+def get_executor(name="background", workers=BACKGROUND_WORKERS):
+    global _executors, _executors_pid
+    if _executors_pid != os.getpid() or name not in _executors:
+        with _executor_lock:
+            if _executors_pid != os.getpid():
+                _executors = {}
+                _executors_pid = os.getpid()
+            if name not in _executors:
+                _executors[name] = ThreadPoolExecutor(workers, thread_name_prefix=name)
+    return _executors[name]
+
+# run fn(*args) after the response, with the current app context (needed for mail)
+def run_in_background(fn, *args, **kwargs):
+    submit(get_executor(), fn, args, kwargs)
+
+# run a maintenance job function after the response, on the jobs executor
+def run_job_in_background(fn, *args, **kwargs):
+    submit(get_executor("jobs", JOB_WORKERS), fn, args, kwargs)
+
+def submit(executor, fn, args, kwargs):
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Background task {fn.__name__} failed: {e}")
+
+    if BACKGROUND_TASKS:
+        executor.submit(run)
+    else:
+        run()